@@ -1,6 +1,8 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import os
 import requests
+from requests.adapters import HTTPAdapter
 from groq import Groq
 import PyPDF2
 import docx
@@ -13,19 +15,24 @@ from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from bs4 import BeautifulSoup
 import json
+import queue
+import types
+import mimetypes
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
 import time
 import traceback
 from datetime import datetime
-from jira import JIRA
-import pandas as pd
 from dotenv import load_dotenv
-from PIL import Image, ImageDraw, ImageChops
-import base64
 import cv2
 import numpy as np
 from skimage.metrics import structural_similarity as ssim
-import matplotlib.pyplot as plt
 import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 # Load environment variables from .env file
 load_dotenv()
@@ -49,6 +56,8 @@ class JiraIntegration:
     
     def connect(self):
         """Connect to Jira"""
+        # Imported on first connect so sessions that never use Jira don't load the client
+        from jira import JIRA
         try:
             self.jira = JIRA(
                 server=self.server_url,
@@ -58,6 +67,7 @@ class JiraIntegration:
             self.jira.myself()
             return True
         except Exception as e:
+            self.jira = None
             st.error(f"Failed to connect to Jira: {e}")
             return False
     
@@ -88,7 +98,8 @@ class JiraIntegration:
                 'priority': {'name': 'Medium'}
             }
             
-            bug = self.jira.create_issue(fields=issue_dict)
+            # prefetch=False: only the key is needed, so skip the follow-up full-issue GET
+            bug = self.jira.create_issue(fields=issue_dict, prefetch=False)
             return bug.key
             
         except Exception as e:
@@ -96,6 +107,65 @@ class JiraIntegration:
             return None
 
 
+_FIGMA_URL_RE = re.compile(r'figma\.com/(?:file|design|proto)/([a-zA-Z0-9]{15,25})(?![a-zA-Z0-9])')
+_FIGMA_FILE_ID_RE = re.compile(r'^[a-zA-Z0-9]{15,25}$')
+
+_EMPTY = {}
+
+def _figma_canvas_info(get, node_type):
+    """Page node; its children are collected"""
+    return {
+        'id': get('id'),
+        'name': get('name'),
+        'children': [],
+        'background_color': get('backgroundColor', {})
+    }, True
+
+def _figma_box_info(get, node_type):
+    """Common fields of positioned nodes, reading absoluteBoundingBox once"""
+    bb_get = (get('absoluteBoundingBox') or _EMPTY).get
+    return {
+        'id': get('id'),
+        'name': get('name'),
+        'type': node_type,
+        'x': bb_get('x', 0),
+        'y': bb_get('y', 0),
+        'width': bb_get('width', 0),
+        'height': bb_get('height', 0),
+    }
+
+def _figma_frame_info(get, node_type):
+    """Frame/container node; its children are collected"""
+    info = _figma_box_info(get, node_type)
+    info['fills'] = get('fills', [])
+    info['strokes'] = get('strokes', [])
+    info['children'] = []
+    return info, True
+
+def _figma_text_info(get, node_type):
+    """Text element"""
+    info = _figma_box_info(get, node_type)
+    info['characters'] = get('characters', '')
+    info['style'] = get('style', {})
+    info['fills'] = get('fills', [])
+    return info, False
+
+def _figma_shape_info(get, node_type):
+    """Shape elements"""
+    info = _figma_box_info(get, node_type)
+    info['fills'] = get('fills', [])
+    info['strokes'] = get('strokes', [])
+    info['corner_radius'] = get('cornerRadius', 0)
+    return info, False
+
+# Node type -> handler returning (info dict, whether to descend into children)
+_FIGMA_NODE_HANDLERS = {
+    'CANVAS': _figma_canvas_info,
+    'FRAME': _figma_frame_info,
+    'TEXT': _figma_text_info,
+    **dict.fromkeys(('RECTANGLE', 'ELLIPSE', 'POLYGON', 'STAR', 'VECTOR'), _figma_shape_info),
+}
+
 class FigmaIntegration:
     """Figma API integration for design comparison testing"""
     
@@ -103,6 +173,10 @@ class FigmaIntegration:
         self.access_token = access_token
         self.base_url = "https://api.figma.com/v1"
         self.headers = {"X-Figma-Token": access_token}
+        # file_id -> (lastModified, file JSON); revalidated via a depth=1 request
+        self._file_cache = {}
+        # (name, version, lastModified) -> extracted design elements
+        self._elements_cache = {}
     
     def extract_file_id(self, file_id_or_url):
         """Extract file ID from Figma URL or return as-is if already an ID"""
@@ -110,20 +184,11 @@ class FigmaIntegration:
         if not ('/' in file_id_or_url or 'figma.com' in file_id_or_url):
             return file_id_or_url
         
-        # Extract file ID from various Figma URL formats
-        patterns = [
-            r'figma\.com/design/([a-zA-Z0-9]+)',
-            r'figma\.com/file/([a-zA-Z0-9]+)',
-            r'figma\.com/proto/([a-zA-Z0-9]+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, file_id_or_url)
-            if match:
-                return match.group(1)
+        # One scan covers the design/file/proto URL formats
+        match = _FIGMA_URL_RE.search(file_id_or_url)
         
         # If no pattern matches, assume it's already a file ID
-        return file_id_or_url
+        return match.group(1) if match else file_id_or_url
     
     def get_file_info(self, file_id_or_url):
         """Get Figma file information and structure"""
@@ -132,7 +197,7 @@ class FigmaIntegration:
             file_id = self.extract_file_id(file_id_or_url)
             
             # Validate file ID format (should be alphanumeric, typically 22-23 characters)
-            if not re.match(r'^[a-zA-Z0-9]{15,25}$', file_id):
+            if not _FIGMA_FILE_ID_RE.match(file_id):
                 st.error(f"Invalid Figma File ID format: {file_id}")
                 st.info("File ID should be alphanumeric, 15-25 characters long. Extract it from your Figma URL.")
                 return None
@@ -164,7 +229,9 @@ class FigmaIntegration:
                 return None
                 
             response.raise_for_status()
-            return response.json()
+            data = response.json()
+            self._file_cache[file_id] = (data.get('lastModified'), data)
+            return data
         except requests.exceptions.RequestException as e:
             st.error(f"Network error connecting to Figma API: {e}")
             return None
@@ -172,6 +239,22 @@ class FigmaIntegration:
             st.error(f"Failed to fetch Figma file info: {e}")
             return None
     
+    def get_file_info_cached(self, file_id_or_url):
+        """Get Figma file information, reusing the cached tree if the file is unchanged"""
+        file_id = self.extract_file_id(file_id_or_url)
+        cached = self._file_cache.get(file_id)
+        
+        if cached:
+            try:
+                # depth=1 returns only the top-level document, enough to compare lastModified
+                response = requests.get(f"{self.base_url}/files/{file_id}", headers=self.headers, params={'depth': 1})
+                if response.status_code == 200 and response.json().get('lastModified') == cached[0]:
+                    return cached[1]
+            except requests.exceptions.RequestException:
+                pass
+        
+        return self.get_file_info(file_id)
+    
     def get_file_images(self, file_id_or_url, node_ids=None, scale=1, format='png'):
         """Get rendered images of Figma nodes"""
         try:
@@ -219,89 +302,43 @@ class FigmaIntegration:
         if not file_data or 'document' not in file_data:
             return design_elements
         
-        def traverse_nodes(node, parent_name=""):
-            if node.get('type') == 'CANVAS':
-                # This is a page
-                page_info = {
-                    'id': node.get('id'),
-                    'name': node.get('name'),
-                    'children': [],
-                    'background_color': node.get('backgroundColor', {})
-                }
-                
-                # Process child nodes
-                for child in node.get('children', []):
-                    child_info = traverse_nodes(child, node.get('name'))
-                    if child_info:
-                        page_info['children'].append(child_info)
-                
-                design_elements['pages'].append(page_info)
-                return page_info
-            
-            elif node.get('type') == 'FRAME':
-                # This is a frame/container
-                frame_info = {
-                    'id': node.get('id'),
-                    'name': node.get('name'),
-                    'type': 'FRAME',
-                    'x': node.get('absoluteBoundingBox', {}).get('x', 0),
-                    'y': node.get('absoluteBoundingBox', {}).get('y', 0),
-                    'width': node.get('absoluteBoundingBox', {}).get('width', 0),
-                    'height': node.get('absoluteBoundingBox', {}).get('height', 0),
-                    'fills': node.get('fills', []),
-                    'strokes': node.get('strokes', []),
-                    'children': []
-                }
-                
-                # Process child nodes
-                for child in node.get('children', []):
-                    child_info = traverse_nodes(child, node.get('name'))
-                    if child_info:
-                        frame_info['children'].append(child_info)
-                
-                return frame_info
-            
-            elif node.get('type') == 'TEXT':
-                # Text element
-                text_info = {
-                    'id': node.get('id'),
-                    'name': node.get('name'),
-                    'type': 'TEXT',
-                    'x': node.get('absoluteBoundingBox', {}).get('x', 0),
-                    'y': node.get('absoluteBoundingBox', {}).get('y', 0),
-                    'width': node.get('absoluteBoundingBox', {}).get('width', 0),
-                    'height': node.get('absoluteBoundingBox', {}).get('height', 0),
-                    'characters': node.get('characters', ''),
-                    'style': node.get('style', {}),
-                    'fills': node.get('fills', [])
-                }
-                return text_info
+        cache_key = (file_data.get('name'), file_data.get('version'), file_data.get('lastModified'))
+        if cache_key[2] and cache_key in self._elements_cache:
+            return self._elements_cache[cache_key]
+        
+        pages = design_elements['pages']
+        handlers = _FIGMA_NODE_HANDLERS
+        
+        # Iterative walk: each entry carries the list its result should be appended to
+        # (None when the parent discards child results), so deep files can't hit the recursion limit
+        pending_nodes = deque((child, "", None) for child in file_data['document'].get('children', []))
+        popleft = pending_nodes.popleft
+        push = pending_nodes.append
+        
+        while pending_nodes:
+            node, parent_name, siblings = popleft()
+            get = node.get
+            node_type = get('type')
+            handler = handlers.get(node_type)
             
-            elif node.get('type') in ['RECTANGLE', 'ELLIPSE', 'POLYGON', 'STAR', 'VECTOR']:
-                # Shape elements
-                shape_info = {
-                    'id': node.get('id'),
-                    'name': node.get('name'),
-                    'type': node.get('type'),
-                    'x': node.get('absoluteBoundingBox', {}).get('x', 0),
-                    'y': node.get('absoluteBoundingBox', {}).get('y', 0),
-                    'width': node.get('absoluteBoundingBox', {}).get('width', 0),
-                    'height': node.get('absoluteBoundingBox', {}).get('height', 0),
-                    'fills': node.get('fills', []),
-                    'strokes': node.get('strokes', []),
-                    'corner_radius': node.get('cornerRadius', 0)
-                }
-                return shape_info
+            if handler is None:
+                # Process children for other node types; their results are not kept
+                descend = True
+                child_parent, child_siblings = parent_name, None
+            else:
+                info, descend = handler(get, node_type)
+                if node_type == 'CANVAS':
+                    pages.append(info)
+                if siblings is not None:
+                    siblings.append(info)
+                child_parent, child_siblings = get('name'), info.get('children')
             
-            elif node.get('children'):
-                # Process children for other node types
-                for child in node.get('children', []):
-                    traverse_nodes(child, parent_name)
-        
-        # Start traversing from document root
-        for child in file_data['document'].get('children', []):
-            traverse_nodes(child)
+            if descend:
+                for child in get('children', ()):
+                    push((child, child_parent, child_siblings))
         
+        if cache_key[2]:
+            self._elements_cache[cache_key] = design_elements
         return design_elements
     
     def test_token_and_file_access(self, file_id_or_url):
@@ -359,21 +396,188 @@ class FigmaIntegration:
             st.error(f"Debug test failed: {e}")
             return False
 
+def _script_ctx_initializer():
+    """Build a ThreadPoolExecutor initializer that lets worker threads call st.* like the script thread"""
+    ctx = get_script_run_ctx()
+    return lambda: add_script_run_ctx(threading.current_thread(), ctx)
+
+_VOLATILE_QUERY_PARAMS = {'ts', 't', 'token', 'cache', 'cb', '_', 'gclid', 'fbclid',
+                          'sid', 'sessionid', 'phpsessid', 'jsessionid'}
+# Per-session budget for each of the screenshot and Figma export caches
+_SESSION_CACHE_MAX_BYTES = 256 * 1024 * 1024
+_SCREENSHOT_CACHE_TTL = 600
+
+@lru_cache(maxsize=4096)
+def _normalize_url(url):
+    """Canonical form of a URL: no fragment, volatile/tracking params or trailing slash; sorted query"""
+    url = urlsplit(url)
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(url.query, keep_blank_values=True)
+        if k.lower() not in _VOLATILE_QUERY_PARAMS and not k.lower().startswith('utm_')
+    ))
+    return urlunsplit((url.scheme.lower(), url.netloc.lower(), url.path.rstrip('/'), query, ''))
+
+def _request_signature(*parts):
+    """SHA-256 of a normalized request; URLs drop fragments, volatile params and param order"""
+    normalized = []
+    for part in parts:
+        if isinstance(part, str) and part.startswith(('http://', 'https://')):
+            part = _normalize_url(part)
+        normalized.append(str(part))
+    return hashlib.sha256('\x1f'.join(normalized).encode()).hexdigest()
+
+class _ByteBoundedCache:
+    """LRU cache of image payloads bounded by their total size rather than entry count"""
+    
+    def __init__(self, max_bytes=_SESSION_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+    
+    def put(self, key, value, nbytes):
+        """Insert value (nbytes large), evicting least recently used entries past max_bytes"""
+        with self._lock:
+            replaced = self._entries.pop(key, None)
+            if replaced is not None:
+                self.nbytes -= replaced[1]
+            self._entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+            # Always keep the entry just added
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+
+_MAX_FIGMA_IMAGE_BYTES = 64 * 1024 * 1024
+# Full-page screenshots decode to tens of MB each, so the cache is bounded by size, not count
+_DECODE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+_CLASSIFY_MAX_SIDE = 512
+_SSIM_PASS_THRESHOLD = 0.9
+# Gaussian window (sigma 1.5) shared by the CPU and GPU SSIM paths
+_SSIM_WINDOW = 11
+_SSIM_CLEAR_MARGIN = 0.05
+_THUMBNAIL_WIDTH = 512
+_decode_cache = OrderedDict()
+_decode_cache_bytes = 0
+_decode_cache_lock = threading.Lock()
+
+def _decode_image(image_bytes, read_mode, size=None):
+    """Decode PNG bytes to a uint8 array (optionally resized), memoized on a content digest"""
+    global _decode_cache_bytes
+    key = (hashlib.blake2b(image_bytes, digest_size=16).digest(), read_mode, size)
+    with _decode_cache_lock:
+        cached = _decode_cache.get(key)
+        if cached is not None:
+            _decode_cache.move_to_end(key)
+            return cached
+    
+    if size is None:
+        decoded = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), read_mode)
+    else:
+        decoded = cv2.resize(_decode_image(image_bytes, read_mode), size, interpolation=cv2.INTER_AREA)
+    # Cached arrays are shared between comparisons, so keep them read-only
+    decoded.setflags(write=False)
+    
+    with _decode_cache_lock:
+        replaced = _decode_cache.pop(key, None)
+        if replaced is not None:
+            _decode_cache_bytes -= replaced.nbytes
+        _decode_cache[key] = decoded
+        _decode_cache_bytes += decoded.nbytes
+        # Evict least recently used arrays, but always keep the one just decoded
+        while _decode_cache_bytes > _DECODE_CACHE_MAX_BYTES and len(_decode_cache) > 1:
+            _, evicted = _decode_cache.popitem(last=False)
+            _decode_cache_bytes -= evicted.nbytes
+    return decoded
+
+@lru_cache(maxsize=1)
+def _kornia_cuda():
+    """(torch, kornia) when both are installed and a CUDA device is present, else None; imported on first use"""
+    try:
+        import torch
+        import kornia
+    except ImportError:
+        return None
+    return (torch, kornia) if torch.cuda.is_available() else None
+
+def _make_thumbnail(image_bytes, max_width=_THUMBNAIL_WIDTH, quality=80):
+    """Downsized WebP copy of an image for the results grid; the full PNG is served on demand"""
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_UNCHANGED)
+    if image is None:
+        return image_bytes
+    height, width = image.shape[:2]
+    if width > max_width:
+        image = cv2.resize(image, (max_width, max(1, round(height * max_width / width))), interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode('.webp', image, [cv2.IMWRITE_WEBP_QUALITY, quality])
+    return encoded.tobytes() if ok else image_bytes
+
+# cv2's thread count is process-wide; concurrent comparisons share one pin and the
+# last one out restores the original setting
+_cv2_pin_lock = threading.Lock()
+_cv2_pin_count = 0
+_cv2_default_threads = None
+
+@contextmanager
+def _cv2_single_threaded():
+    """Limit OpenCV to one internal thread for the duration of the block"""
+    global _cv2_pin_count, _cv2_default_threads
+    with _cv2_pin_lock:
+        if _cv2_pin_count == 0:
+            _cv2_default_threads = cv2.getNumThreads()
+            cv2.setNumThreads(1)
+        _cv2_pin_count += 1
+    try:
+        yield
+    finally:
+        with _cv2_pin_lock:
+            _cv2_pin_count -= 1
+            if _cv2_pin_count == 0:
+                cv2.setNumThreads(_cv2_default_threads)
+
 class DesignComparisonTester:
     """Compare Figma designs with live website screenshots"""
     
+    WINDOW_SIZE = "1920,1080"
+    
     def __init__(self, figma_integration):
         self.figma = figma_integration
         self.driver = None
         self.comparison_results = []
+        # Keep-alive pool for Figma CDN downloads
+        self.session = requests.Session()
+        # Scratch arrays are per thread (pages are compared concurrently) and reused across pages
+        self._scratch = threading.local()
+    
+    def _get_buffer(self, name, shape, dtype):
+        """Return this thread's scratch array for `name`, reallocating only when the shape changes"""
+        buffer = getattr(self._scratch, name, None)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            setattr(self._scratch, name, buffer)
+        return buffer
     
     def setup_driver(self):
-        """Setup Chrome driver for screenshot capture"""
+        """Setup Chrome driver for screenshot capture, reusing a live one"""
+        if self.driver:
+            return True
+        
         chrome_options = Options()
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--window-size=1920,1080")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument(f"--window-size={self.WINDOW_SIZE}")
         chrome_options.add_argument("--force-device-scale-factor=1")
+        # Return on DOMContentLoaded; capture_website_screenshot already waits for rendering
+        chrome_options.page_load_strategy = 'eager'
         
         try:
             self.driver = webdriver.Chrome(options=chrome_options)
@@ -384,7 +588,8 @@ class DesignComparisonTester:
     
     def capture_website_screenshot(self, url, element_selector=None):
         """Capture screenshot of website or specific element"""
-        if not self.driver:
+        # The driver is started on first use, so fully cached runs never launch Chrome
+        if not self.setup_driver():
             return None
         
         try:
@@ -400,66 +605,176 @@ class DesignComparisonTester:
             st.error(f"Failed to capture screenshot: {e}")
             return None
     
+    def capture_website_screenshot_cached(self, url, element_selector=None, reuse=False):
+        """Capture a screenshot; with reuse, return one of the exact same URL taken within the cache TTL"""
+        cache = st.session_state.setdefault('_screenshot_cache', _ByteBoundedCache())
+        # Keyed on the exact URL: fragments and query params can change what the page renders
+        key = hashlib.sha256('\x1f'.join(map(str, (url, element_selector, self.WINDOW_SIZE))).encode()).hexdigest()
+        hit = cache.get(key)
+        if reuse and hit and time.time() - hit[0] < _SCREENSHOT_CACHE_TTL:
+            return hit[1]
+        
+        screenshot = self.capture_website_screenshot(url, element_selector)
+        if screenshot:
+            cache.put(key, (time.time(), screenshot), len(screenshot))
+        return screenshot
+    
     def download_figma_image(self, image_url):
         """Download image from Figma API"""
         try:
-            response = requests.get(image_url)
-            response.raise_for_status()
-            return response.content
+            with self.session.get(image_url, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                buffer = BytesIO()
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    buffer.write(chunk)
+                    if buffer.tell() > _MAX_FIGMA_IMAGE_BYTES:
+                        st.error(f"Figma image exceeds {_MAX_FIGMA_IMAGE_BYTES // (1024 * 1024)} MB, skipping")
+                        return None
+                return buffer.getvalue()
         except Exception as e:
             st.error(f"Failed to download Figma image: {e}")
             return None
     
+    def _diff_hotspots(self, diff, score, block=32, top_k=10, noise_floor=10):
+        """Summarize a grayscale diff into the top-K most different block regions"""
+        height, width = diff.shape[:2]
+        # Anchored box filter: sampling every `block` pixels yields per-block mean abs diff
+        block_means = cv2.boxFilter(diff, cv2.CV_32F, (block, block), anchor=(0, 0))[::block, ::block]
+        flat = block_means.ravel()
+        
+        k = min(top_k, flat.size)
+        candidates = np.argpartition(flat, -k)[-k:]
+        candidates = candidates[np.argsort(flat[candidates])[::-1]]
+        candidates = candidates[flat[candidates] >= noise_floor]
+        
+        rows, cols = np.unravel_index(candidates, block_means.shape)
+        hotspots = []
+        for row, col, mean_diff in zip(rows, cols, flat[candidates]):
+            x, y = int(col) * block, int(row) * block
+            w, h = min(block, width - x), min(block, height - y)
+            hotspots.append({
+                'type': 'region_difference',
+                'severity': 'high' if mean_diff > 40 else 'medium',
+                'region': (x, y, w, h),
+                'description': f'Region at ({x}, {y}) size {w}x{h} differs by {mean_diff:.0f}/255 on average (structural similarity: {score:.2%})'
+            })
+        return hotspots
+    
+    def _gpu_ssim(self, torch, kornia, image_a, image_b):
+        """Mean SSIM of two uint8 grayscale or BGR arrays computed on the GPU with kornia"""
+        def to_tensor(image):
+            tensor = torch.from_numpy(np.ascontiguousarray(image)).cuda().float().div_(255.0)
+            return tensor[None, None] if tensor.ndim == 2 else tensor.permute(2, 0, 1)[None]
+        
+        # 'valid' padding drops the borders, as skimage crops them before averaging
+        with torch.no_grad():
+            return float(kornia.metrics.ssim(to_tensor(image_a), to_tensor(image_b), _SSIM_WINDOW,
+                                             padding='valid').mean().item())
+    
+    def _ssim_score(self, image_a, image_b):
+        """Scalar SSIM over a Gaussian window, on the GPU when kornia/CUDA are available"""
+        gpu = _kornia_cuda()
+        if gpu:
+            return self._gpu_ssim(*gpu, image_a, image_b)
+        return ssim(image_a, image_b, data_range=255, win_size=_SSIM_WINDOW,
+                    gaussian_weights=True, sigma=1.5, use_sample_covariance=False,
+                    channel_axis=2 if image_a.ndim == 3 else None)
+    
+    def _compare_for_display(self, figma_image_data, website_image_data):
+        """Structural comparison plus the grid thumbnails, so both run on the comparison pool"""
+        comparison = self.compare_images(figma_image_data, website_image_data, "structural")
+        if comparison:
+            comparison['thumbnails'] = tuple(
+                _make_thumbnail(image_data) if image_data else None
+                for image_data in (figma_image_data, website_image_data, comparison['comparison_image'])
+            )
+        return comparison
+    
     def compare_images(self, figma_image_data, website_image_data, comparison_type="structural"):
         """Compare Figma design with website screenshot"""
         try:
-            figma_img = Image.open(BytesIO(figma_image_data))
-            website_img = Image.open(BytesIO(website_image_data))
+            # Decode straight to uint8; the structural path only needs luminance
+            read_mode = cv2.IMREAD_GRAYSCALE if comparison_type == "structural" else cv2.IMREAD_COLOR
+            figma_array = _decode_image(figma_image_data, read_mode)
+            website_array = _decode_image(website_image_data, read_mode)
             
-            min_width = min(figma_img.width, website_img.width)
-            min_height = min(figma_img.height, website_img.height)
+            figma_height, figma_width = figma_array.shape[:2]
+            website_height, website_width = website_array.shape[:2]
+            min_width = min(figma_width, website_width)
+            min_height = min(figma_height, website_height)
             
-            figma_resized = figma_img.resize((min_width, min_height), Image.Resampling.LANCZOS)
-            website_resized = website_img.resize((min_width, min_height), Image.Resampling.LANCZOS)
-            
-            figma_array = np.array(figma_resized.convert('RGB'))
-            website_array = np.array(website_resized.convert('RGB'))
+            if (figma_width, figma_height) != (min_width, min_height):
+                figma_array = _decode_image(figma_image_data, read_mode, (min_width, min_height))
+            if (website_width, website_height) != (min_width, min_height):
+                website_array = _decode_image(website_image_data, read_mode, (min_width, min_height))
             
             comparison_result = {
                 'similarity_score': 0,
                 'differences_found': [],
                 'comparison_image': None,
-                'figma_dimensions': (figma_img.width, figma_img.height),
-                'website_dimensions': (website_img.width, website_img.height)
+                'figma_dimensions': (figma_width, figma_height),
+                'website_dimensions': (website_width, website_height)
             }
             
             if comparison_type == "structural":
-                gray_figma = cv2.cvtColor(figma_array, cv2.COLOR_RGB2GRAY)
-                gray_website = cv2.cvtColor(website_array, cv2.COLOR_RGB2GRAY)
+                gray_figma = figma_array
+                gray_website = website_array
                 
-                score, diff = ssim(gray_figma, gray_website, full=True)
-                comparison_result['similarity_score'] = score
+                # Classify on a thumbnail (longest side <= 512px); full resolution is only
+                # needed for the heatmap of failing pages
+                thumb_scale = min(1.0, _CLASSIFY_MAX_SIDE / max(min_width, min_height))
+                thumb_size = (min_width, min_height)
+                if thumb_scale < 1.0:
+                    thumb_size = (max(_SSIM_WINDOW, round(min_width * thumb_scale)), max(_SSIM_WINDOW, round(min_height * thumb_scale)))
+                    thumb_figma = _decode_image(figma_image_data, read_mode, thumb_size)
+                    thumb_website = _decode_image(website_image_data, read_mode, thumb_size)
+                else:
+                    thumb_figma, thumb_website = gray_figma, gray_website
                 
-                diff = (diff * 255).astype("uint8")
-                comparison_result['comparison_image'] = diff
+                score = self._ssim_score(thumb_figma, thumb_website)
                 
-                if score < 0.9:
-                    comparison_result['differences_found'].append({
+                # A thumbnail score just above the gate can hide fine detail lost to
+                # downsampling or colour shifts invisible in luminance; only that ambiguous
+                # band is re-checked at full resolution and then on colour thumbnails
+                if _SSIM_PASS_THRESHOLD <= score < _SSIM_PASS_THRESHOLD + _SSIM_CLEAR_MARGIN:
+                    if thumb_scale < 1.0:
+                        score = self._ssim_score(gray_figma, gray_website)
+                    if score >= _SSIM_PASS_THRESHOLD:
+                        score = min(score, self._ssim_score(
+                            _decode_image(figma_image_data, cv2.IMREAD_COLOR, thumb_size),
+                            _decode_image(website_image_data, cv2.IMREAD_COLOR, thumb_size)
+                        ))
+                comparison_result['similarity_score'] = score
+                
+                if score < _SSIM_PASS_THRESHOLD:
+                    # Only reported pages need a heatmap; absdiff stays in uint8 instead of
+                    # materializing SSIM's float64 map
+                    diff = cv2.absdiff(gray_figma, gray_website,
+                                       dst=self._get_buffer('gray_diff', gray_figma.shape, np.uint8))
+                    # Encode now so the scratch buffer can be reused by the next page
+                    comparison_result['comparison_image'] = cv2.imencode('.png', diff)[1].tobytes()
+                    
+                    hotspots = self._diff_hotspots(diff, score)
+                    comparison_result['differences_found'].extend(hotspots or [{
                         'type': 'structural_difference',
                         'severity': 'high' if score < 0.7 else 'medium',
                         'description': f'Structural similarity: {score:.2%}'
-                    })
+                    }])
             
             elif comparison_type == "pixel_perfect":
-                diff = ImageChops.difference(figma_resized.convert('RGB'), website_resized.convert('RGB'))
-                diff_array = np.array(diff)
+                # Signed subtract into a reused int16 buffer, then fold back to uint8
+                diff_buf = self._get_buffer('pixel_diff', figma_array.shape, np.int16)
+                np.subtract(figma_array, website_array, dtype=np.int16, out=diff_buf)
+                np.abs(diff_buf, out=diff_buf)
+                diff_array = self._get_buffer('pixel_diff_u8', figma_array.shape, np.uint8)
+                np.copyto(diff_array, diff_buf, casting='unsafe')
                 
-                different_pixels = np.count_nonzero(diff_array.sum(axis=2))
+                different_pixels = np.count_nonzero(diff_array.any(axis=2))
                 total_pixels = diff_array.shape[0] * diff_array.shape[1]
                 difference_percentage = (different_pixels / total_pixels) * 100
                 
                 comparison_result['similarity_score'] = 1 - (difference_percentage / 100)
-                comparison_result['comparison_image'] = np.array(diff)
+                comparison_result['comparison_image'] = cv2.imencode('.png', diff_array)[1].tobytes()
                 
                 if difference_percentage > 5:
                     comparison_result['differences_found'].append({
@@ -474,146 +789,225 @@ class DesignComparisonTester:
             st.error(f"Image comparison failed: {e}")
             return None
     
-def perform_design_comparison(self, figma_file_id, website_url, pages_to_compare=None):
-    """Perform complete design comparison between Figma and website"""
-    if not self.setup_driver():
-        return None
-
-    results = {
-        'overall_score': 0,
-        'pages_compared': 0,
-        'issues_found': [],
-        'comparison_details': []
-    }
-
-    try:
-        st.info("Fetching Figma file data...")
-        file_data = self.figma.get_file_info(figma_file_id)
-        if not file_data:
-            return None
+    def perform_design_comparison(self, figma_file_id, website_url, pages_to_compare=None, reuse_screenshot=False):
+        """Perform complete design comparison between Figma and website
+
+        Pages are compared on a thread pool sized to the CPU count. While more than one
+        page is compared, OpenCV is limited to a single internal thread so the pool and
+        cv2 don't oversubscribe the cores; a single page keeps cv2's default threading.
+        """
+        results = {
+            'overall_score': 0,
+            'pages_compared': 0,
+            'issues_found': [],
+            'comparison_details': []
+        }
 
-        design_elements = self.figma.extract_design_elements(file_data)
+        attach_script_ctx = _script_ctx_initializer()
+        # The screenshot only depends on website_url, so the page load runs on its own
+        # thread while the Figma file, export URLs and images are being fetched
+        screenshot_pool = ThreadPoolExecutor(max_workers=1, initializer=attach_script_ctx)
+        try:
+            screenshot_future = screenshot_pool.submit(self.capture_website_screenshot_cached, website_url,
+                                                  reuse=reuse_screenshot)
 
-        page_node_ids = [page['id'] for page in design_elements['pages']]
-        if pages_to_compare:
-            page_node_ids = [
-                pid for pid in page_node_ids
-                if any(page['name'].lower() in pages_to_compare for page in design_elements['pages'] if page['id'] == pid)
-            ]
+            st.info("Fetching Figma file data...")
+            file_data = self.figma.get_file_info_cached(figma_file_id)
+            if not file_data:
+                return None
 
-        # --- batching logic ---
-        # --- adaptive batching logic ---
+            design_elements = self.figma.extract_design_elements(file_data)
 
-        # Define page_node_ids before batching
-        page_node_ids = [page['id'] for page in design_elements['pages']]
+            page_node_ids = [page['id'] for page in design_elements['pages']]
+            if pages_to_compare:
+                page_node_ids = [
+                    pid for pid in page_node_ids
+                    if any(page['name'].lower() in pages_to_compare for page in design_elements['pages'] if page['id'] == pid)
+                ]
 
-        st.info(f"Generating Figma design images in batches (batch_size={batch_size}, scale={scale})...")
-        batched_images = {}
+            # --- adaptive batching logic ---
+            batch_size = 5  # You can adjust this value as needed
+            scale = 2       # Default scale, can be parameterized
 
-        def fetch_with_retry(node_ids, scale, batch_label=""):
-            """Try fetching node images, progressively reducing batch size if needed"""
-            if not node_ids:
-                return {}
+            # Exports already downloaded this session for the same file revision are reused
+            figma_cache = st.session_state.setdefault('_figma_cache', _ByteBoundedCache())
+            figma_keys = {
+                pid: _request_signature(self.figma.extract_file_id(figma_file_id), file_data.get('lastModified'), pid, scale)
+                for pid in page_node_ids
+            }
+            cached_images = {pid: figma_cache.get(key) for pid, key in figma_keys.items()}
+            cached_images = {pid: image for pid, image in cached_images.items() if image is not None}
+            uncached_node_ids = [pid for pid in page_node_ids if pid not in cached_images]
 
-            # Try full batch first
-            response = self.figma.get_file_images(figma_file_id, node_ids, scale=scale)
-            if response and 'images' in response:
-                return response['images']
+            if uncached_node_ids:
+                st.info(f"Generating Figma design images in batches (batch_size={batch_size}, scale={scale})...")
+            batched_images = {}
 
-            # If batch failed, reduce batch size
-            if len(node_ids) > 1:
-                mid = len(node_ids) // 2
-                st.warning(f"Batch {batch_label} failed at scale {scale}, splitting into smaller batches...")
-                left = fetch_with_retry(node_ids[:mid], scale, batch_label + "L")
-                right = fetch_with_retry(node_ids[mid:], scale, batch_label + "R")
-                return {**left, **right}
-            else:
-                # Single node request failed, retry with scale=1 if not already
-                if scale != 1:
-                    st.warning(f"Node {node_ids[0]} failed at scale {scale}, retrying at scale=1...")
-                    return fetch_with_retry(node_ids, 1, batch_label)
-                else:
-                    st.error(f"Node {node_ids[0]} failed even at scale=1. Skipping...")
+            def fetch_with_retry(node_ids, scale, batch_label=""):
+                """Try fetching node images, progressively reducing batch size if needed"""
+                if not node_ids:
                     return {}
 
-        # Process in top-level batches
-        batch_size = 5  # You can adjust this value as needed
-        scale = 2       # Default scale, can be parameterized
-
-        for i in range(0, len(page_node_ids), batch_size):
-            batch = page_node_ids[i:i + batch_size]
-            images = fetch_with_retry(batch, scale, f"{i//batch_size+1}")
-            batched_images.update(images)
-
-        if not batched_images:
-            st.error("Failed to get any Figma images")
-            return None
-        # ----------------------
-
-        # ----------------------
-
-        total_score = 0
-        pages_processed = 0
-
-        for page in design_elements['pages']:
-            if page['id'] not in batched_images:
-                continue
-
-            st.info(f"Comparing page: {page['name']}")
-
-            figma_image_url = batched_images[page['id']]
-            figma_image_data = self.download_figma_image(figma_image_url)
-            if not figma_image_data:
-                continue
+                # Try full batch first
+                response = self.figma.get_file_images(figma_file_id, node_ids, scale=scale)
+                if response and 'images' in response:
+                    return response['images']
+
+                # If batch failed, reduce batch size
+                if len(node_ids) > 1:
+                    mid = len(node_ids) // 2
+                    st.warning(f"Batch {batch_label} failed at scale {scale}, splitting into smaller batches...")
+                    left = fetch_with_retry(node_ids[:mid], scale, batch_label + "L")
+                    right = fetch_with_retry(node_ids[mid:], scale, batch_label + "R")
+                    return {**left, **right}
+                else:
+                    # Single node request failed, retry with scale=1 if not already
+                    if scale != 1:
+                        st.warning(f"Node {node_ids[0]} failed at scale {scale}, retrying at scale=1...")
+                        return fetch_with_retry(node_ids, 1, batch_label)
+                    else:
+                        st.error(f"Node {node_ids[0]} failed even at scale=1. Skipping...")
+                        return {}
+
+            # Process in top-level batches
+            for i in range(0, len(uncached_node_ids), batch_size):
+                batch = uncached_node_ids[i:i + batch_size]
+                images = fetch_with_retry(batch, scale, f"{i//batch_size+1}")
+                batched_images.update(images)
+
+            if not batched_images and not cached_images:
+                st.error("Failed to get any Figma images")
+                return None
+            # ----------------------
 
-            website_image_data = self.capture_website_screenshot(website_url)
-            if not website_image_data:
-                continue
+            # ----------------------
 
-            comparison = self.compare_images(figma_image_data, website_image_data, "structural")
+            total_score = 0
+            pages_processed = 0
 
-            if comparison:
-                page_result = {
-                    'page_name': page['name'],
-                    'page_id': page['id'],
-                    'similarity_score': comparison['similarity_score'],
-                    'differences': comparison['differences_found'],
-                    'figma_image': base64.b64encode(figma_image_data).decode(),
-                    'website_image': base64.b64encode(website_image_data).decode(),
-                    'comparison_image': base64.b64encode(
-                        cv2.imencode('.png', comparison['comparison_image'])[1]
-                    ).decode() if comparison['comparison_image'] is not None else None
-                }
+            pages = [
+                page for page in design_elements['pages']
+                if page['id'] in batched_images or page['id'] in cached_images
+            ]
 
-                results['comparison_details'].append(page_result)
-                total_score += comparison['similarity_score']
-                pages_processed += 1
-
-                for diff in comparison['differences_found']:
-                    issue = {
-                        'page': page['name'],
-                        'type': diff['type'],
-                        'severity': diff['severity'],
-                        'description': diff['description'],
-                        'figma_image': figma_image_data,
-                        'website_image': website_image_data
+            # Stage 1: Figma CDN downloads are I/O-bound, fetch the uncached ones concurrently
+            to_download = [page for page in pages if page['id'] not in cached_images]
+            if to_download:
+                st.info(f"Downloading {len(to_download)} Figma page images...")
+            with ThreadPoolExecutor(max_workers=max(1, min(8, len(to_download))), initializer=attach_script_ctx) as pool:
+                downloaded = dict(zip(
+                    (page['id'] for page in to_download),
+                    pool.map(lambda page: self.download_figma_image(batched_images[page['id']]), to_download)
+                ))
+            for pid, image_data in downloaded.items():
+                if image_data:
+                    figma_cache.put(figma_keys[pid], image_data, len(image_data))
+            figma_images = [cached_images.get(page['id']) or downloaded.get(page['id']) for page in pages]
+
+            # Stage 2 + 3: every page is compared against the one screenshot; pairs are handed
+            # to the comparison pool (cv2/NumPy release the GIL)
+            website_image_data = screenshot_future.result()
+            compared = {}
+            # With several pages in flight the pool already uses every core; cv2's own
+            # thread pool on top of that only oversubscribes, so pin it to one thread
+            cv2_pin = _cv2_single_threaded() if len(pages) > 1 else nullcontext()
+            with cv2_pin, ThreadPoolExecutor(max_workers=os.cpu_count() or 1, initializer=attach_script_ctx) as pool:
+                pending = {}
+                for index, (page, figma_image_data) in enumerate(zip(pages, figma_images)):
+                    if not figma_image_data:
+                        continue
+
+                    st.info(f"Comparing page: {page['name']}")
+
+                    if not website_image_data:
+                        continue
+
+                    future = pool.submit(self._compare_for_display, figma_image_data, website_image_data)
+                    pending[future] = (index, page, figma_image_data, website_image_data)
+
+                for future in as_completed(pending):
+                    index, page, figma_image_data, website_image_data = pending[future]
+                    compared[index] = (future.result(), page, figma_image_data, website_image_data)
+
+            # Aggregate in page order regardless of completion order
+            for index in sorted(compared):
+                comparison, page, figma_image_data, website_image_data = compared[index]
+
+                if comparison:
+                    page_result = {
+                        'page_name': page['name'],
+                        'page_id': page['id'],
+                        'similarity_score': comparison['similarity_score'],
+                        'differences': comparison['differences_found'],
+                        # Raw PNG bytes: st.image and Jira attachments take them as-is
+                        'figma_image_bytes': figma_image_data,
+                        'website_image_bytes': website_image_data,
+                        'comparison_image_bytes': comparison['comparison_image'],
+                        # WebP thumbnails for the results grid
+                        'figma_thumb': comparison['thumbnails'][0],
+                        'website_thumb': comparison['thumbnails'][1],
+                        'comparison_thumb': comparison['thumbnails'][2]
                     }
-                    results['issues_found'].append(issue)
 
-        results['overall_score'] = total_score / pages_processed if pages_processed > 0 else 0
-        results['pages_compared'] = pages_processed
-        return results
+                    results['comparison_details'].append(page_result)
+                    total_score += comparison['similarity_score']
+                    pages_processed += 1
+
+                    for diff in comparison['differences_found']:
+                        issue = {
+                            'page': page['name'],
+                            'type': diff['type'],
+                            'severity': diff['severity'],
+                            'description': diff['description'],
+                            'figma_image': figma_image_data,
+                            'website_image': website_image_data
+                        }
+                        results['issues_found'].append(issue)
+
+            results['overall_score'] = total_score / pages_processed if pages_processed > 0 else 0
+            results['pages_compared'] = pages_processed
+            return results
 
-    except Exception as e:
-        st.error(f"Design comparison failed: {e}")
-    finally:
-        if self.driver:
-            self.driver.quit()
+        except Exception as e:
+            st.error(f"Design comparison failed: {e}")
+        finally:
+            # Let an in-flight capture finish before its driver is released
+            screenshot_pool.shutdown(wait=True)
+            # One driver serves every page of the run; release it once at the end
+            if self.driver:
+                self.driver.quit()
+                self.driver = None
 
 
 class EnhancedJiraIntegration(JiraIntegration):
     """Enhanced Jira integration with design comparison bug reporting"""
     
+    def __init__(self, server_url, email, api_token, project_key):
+        super().__init__(server_url, email, api_token, project_key)
+        # Connection pool for direct REST calls, sized for concurrent ticket creation;
+        # retries are left to the caller since attachment uploads aren't idempotent
+        self.adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+        self.session = requests.Session()
+        self.session.auth = (email, api_token)
+        self.session.mount("https://", self.adapter)
+    
+    def add_attachments(self, issue_key, attachments):
+        """Upload (filename, bytes) pairs to an issue in a single multipart request"""
+        files = [
+            ('file', (filename, data, mimetypes.guess_type(filename)[0] or 'application/octet-stream'))
+            for filename, data in attachments
+        ]
+        if not files:
+            return []
+        
+        response = self.session.post(
+            f"{self.server_url.rstrip('/')}/rest/api/2/issue/{issue_key}/attachments",
+            files=files,
+            headers={'X-Atlassian-Token': 'no-check'}
+        )
+        response.raise_for_status()
+        return response.json()
+    
     def create_design_bug(self, page_name, issue_details, figma_image=None, website_image=None):
         """Create design-specific bug in Jira with images"""
         if not self.jira:
@@ -647,32 +1041,21 @@ class EnhancedJiraIntegration(JiraIntegration):
                 'labels': ['design-comparison', 'automated-testing', 'figma-integration']
             }
             
-            bug = self.jira.create_issue(fields=issue_dict)
+            # prefetch=False: only the key is needed, so skip the follow-up full-issue GET
+            bug = self.jira.create_issue(fields=issue_dict, prefetch=False)
             
-            # Attach images if provided
-            if figma_image and bug:
-                try:
-                    # Create temporary file for Figma design
-                    figma_filename = f"figma_design_{page_name}_{bug.key}.png"
-                    with open(figma_filename, 'wb') as f:
-                        f.write(figma_image)
-                    
-                    self.jira.add_attachment(issue=bug, attachment=figma_filename, filename=f"Figma_Design_{page_name}.png")
-                    os.remove(figma_filename)  # Clean up
-                except Exception as e:
-                    st.warning(f"Failed to attach Figma image: {e}")
+            # Attach both images in one multipart upload, straight from memory
+            attachments = []
+            if figma_image:
+                attachments.append((f"Figma_Design_{page_name}.png", figma_image))
+            if website_image:
+                attachments.append((f"Website_Screenshot_{page_name}.png", website_image))
             
-            if website_image and bug:
+            if attachments and bug:
                 try:
-                    # Create temporary file for website screenshot
-                    website_filename = f"website_screenshot_{page_name}_{bug.key}.png"
-                    with open(website_filename, 'wb') as f:
-                        f.write(website_image)
-                    
-                    self.jira.add_attachment(issue=bug, attachment=website_filename, filename=f"Website_Screenshot_{page_name}.png")
-                    os.remove(website_filename)  # Clean up
+                    self.add_attachments(bug.key, attachments)
                 except Exception as e:
-                    st.warning(f"Failed to attach website screenshot: {e}")
+                    st.warning(f"Failed to attach design images: {e}")
             
             return bug.key
             
@@ -680,14 +1063,43 @@ class EnhancedJiraIntegration(JiraIntegration):
             st.error(f"Failed to create design bug: {e}")
             return None
 
+_SCHEME_RE = re.compile(r'https?://', re.IGNORECASE)
+
+# Runs in the page; mirrors the per-element Selenium reads it replaces
+_PAGE_EXTRACTION_SCRIPT = """
+const text = el => (el.innerText || '').trim();
+const buttons = [...document.querySelectorAll('button'), ...document.querySelectorAll("input[type='submit']")];
+const navs = [...document.querySelectorAll('nav'), ...document.querySelectorAll('.nav, .navbar, .menu')];
+return {
+    content: document.body ? document.body.innerText.slice(0, 2000) : '',
+    forms: [...document.forms].map(f => ({
+        action: f.getAttribute('action'),
+        method: f.method,
+        inputs: [...f.querySelectorAll('input')].map(e => ({
+            type: e.type,
+            name: e.name,
+            placeholder: e.placeholder,
+            required: e.required
+        }))
+    })),
+    buttons: buttons.map(b => ({
+        text: text(b) || b.value,
+        type: b.type,
+        id: b.id,
+        class: b.className
+    })),
+    navigation: navs.map(n => [...n.querySelectorAll('a')].map(a => ({text: text(a), href: a.href})))
+};
+"""
+
 class WebCrawler:
     """Web crawler using Selenium for dynamic content"""
     
     def __init__(self):
         self.driver = None
-        
-    def setup_driver(self):
-        """Setup Chrome driver with options"""
+    
+    def _create_driver(self):
+        """Launch a headless Chrome driver, or return None if it can't start"""
         chrome_options = Options()
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--no-sandbox")
@@ -696,14 +1108,48 @@ class WebCrawler:
         chrome_options.add_argument("--window-size=1920,1080")
         
         try:
-            self.driver = webdriver.Chrome(options=chrome_options)
-            return True
+            return webdriver.Chrome(options=chrome_options)
         except Exception as e:
             st.error(f"Failed to setup Chrome driver: {e}")
-            return False
+            return None
+        
+    def setup_driver(self):
+        """Setup Chrome driver with options"""
+        self.driver = self._create_driver()
+        return self.driver is not None
+    
+    def _fetch_page(self, page_url, drivers, collect_links):
+        """Load one page on a driver borrowed from the pool; return its data and outgoing links.
+
+        A page that fails to load comes back as an entry carrying the error, so one bad URL
+        doesn't lose the rest of its level.
+        """
+        driver = drivers.get()
+        try:
+            driver.get(page_url)
+            time.sleep(2)  # Wait for page to load
+            
+            page_data = self.extract_page_data(page_url, driver)
+            
+            links = []
+            if collect_links:
+                for link in driver.find_elements(By.TAG_NAME, "a")[:10]:  # Limit links per page
+                    try:
+                        href = link.get_attribute("href")
+                        if href and _SCHEME_RE.match(href):
+                            links.append(href)
+                    except:
+                        continue
+            return page_data, links
+        except Exception as e:
+            page_data = self._empty_page_data(page_url)
+            page_data['errors'].append(f"Load error: {e}")
+            return page_data, []
+        finally:
+            drivers.put(driver)
     
-    def crawl_website(self, url, max_pages=5, depth=2):
-        """Crawl website and extract content"""
+    def crawl_website(self, url, max_pages=5, depth=2, max_workers=4):
+        """Crawl website and extract content, loading each BFS level on a pool of drivers"""
         if not self.setup_driver():
             return None
             
@@ -712,39 +1158,54 @@ class WebCrawler:
             'forms': [],
             'buttons': [],
             'links': [],
-            'navigation': []
+            'navigation': [],
+            # Running totals so dashboards don't rescan every page on each rerun
+            'forms_count': 0,
+            'buttons_count': 0
         }
         
         visited_urls = set()
-        urls_to_visit = [(url, 0)]
+        frontier = [url]
+        all_drivers = [self.driver]
+        drivers = queue.Queue()
+        drivers.put(self.driver)
         
         try:
-            while urls_to_visit and len(crawled_data['pages']) < max_pages:
-                current_url, current_depth = urls_to_visit.pop(0)
-                
-                if current_url in visited_urls or current_depth > depth:
-                    continue
-                    
-                visited_urls.add(current_url)
+            for current_depth in range(depth + 1):
+                # Pick this level's unvisited URLs in discovery order, within the page budget;
+                # fragment, trailing-slash and tracking-param variants count as the same page
+                budget = max_pages - len(crawled_data['pages'])
+                level = []
+                for candidate in frontier:
+                    if len(level) >= budget:
+                        break
+                    key = _normalize_url(candidate)
+                    if key not in visited_urls:
+                        visited_urls.add(key)
+                        level.append(candidate)
+                if not level:
+                    break
                 
-                # Load page
-                self.driver.get(current_url)
-                time.sleep(2)  # Wait for page to load
+                # Launch extra drivers only as far as this level can use them
+                while len(all_drivers) < min(max_workers, len(level)):
+                    driver = self._create_driver()
+                    if not driver:
+                        break
+                    all_drivers.append(driver)
+                    drivers.put(driver)
                 
-                # Extract page content
-                page_data = self.extract_page_data(current_url)
-                crawled_data['pages'].append(page_data)
+                with ThreadPoolExecutor(max_workers=len(all_drivers), initializer=_script_ctx_initializer()) as pool:
+                    fetched = list(pool.map(
+                        lambda page_url: self._fetch_page(page_url, drivers, current_depth < depth),
+                        level
+                    ))
                 
-                # Find more links if within depth limit
-                if current_depth < depth:
-                    links = self.driver.find_elements(By.TAG_NAME, "a")
-                    for link in links[:10]:  # Limit links per page
-                        try:
-                            href = link.get_attribute("href")
-                            if href and href.startswith(('http', 'https')):
-                                urls_to_visit.append((href, current_depth + 1))
-                        except:
-                            continue
+                frontier = []
+                for page_data, links in fetched:
+                    crawled_data['pages'].append(page_data)
+                    crawled_data['forms_count'] += len(page_data['forms'])
+                    crawled_data['buttons_count'] += len(page_data['buttons'])
+                    frontier.extend(links)
             
             return crawled_data
             
@@ -752,12 +1213,13 @@ class WebCrawler:
             st.error(f"Crawling error: {e}")
             return crawled_data
         finally:
-            if self.driver:
-                self.driver.quit()
+            for driver in all_drivers:
+                driver.quit()
+            self.driver = None
     
-    def extract_page_data(self, url):
-        """Extract detailed data from current page"""
-        page_data = {
+    @staticmethod
+    def _empty_page_data(url):
+        return {
             'url': url,
             'title': '',
             'content': '',
@@ -768,64 +1230,122 @@ class WebCrawler:
             'images': [],
             'errors': []
         }
+    
+    def extract_page_data(self, url, driver=None):
+        """Extract detailed data from current page"""
+        driver = driver or self.driver
+        page_data = self._empty_page_data(url)
         
         try:
             # Basic page info
-            page_data['title'] = self.driver.title
-            page_data['content'] = self.driver.find_element(By.TAG_NAME, "body").text[:2000]
+            page_data['title'] = driver.title
             
-            # Extract forms
-            forms = self.driver.find_elements(By.TAG_NAME, "form")
-            for form in forms:
-                form_data = {
-                    'action': form.get_attribute("action") or "current_page",
-                    'method': form.get_attribute("method") or "GET",
-                    'inputs': []
-                }
-                
-                inputs = form.find_elements(By.TAG_NAME, "input")
-                for inp in inputs:
-                    form_data['inputs'].append({
-                        'type': inp.get_attribute("type"),
-                        'name': inp.get_attribute("name"),
-                        'placeholder': inp.get_attribute("placeholder"),
-                        'required': inp.get_attribute("required") is not None
-                    })
-                
-                page_data['forms'].append(form_data)
-            
-            # Extract buttons
-            buttons = self.driver.find_elements(By.TAG_NAME, "button")
-            buttons.extend(self.driver.find_elements(By.CSS_SELECTOR, "input[type='submit']"))
+            # Collect content, forms, buttons and navigation in one WebDriver round trip
+            extracted = driver.execute_script(_PAGE_EXTRACTION_SCRIPT)
+            page_data['content'] = extracted['content']
             
-            for button in buttons:
-                page_data['buttons'].append({
-                    'text': button.text or button.get_attribute("value"),
-                    'type': button.get_attribute("type"),
-                    'id': button.get_attribute("id"),
-                    'class': button.get_attribute("class")
+            for form in extracted['forms']:
+                page_data['forms'].append({
+                    'action': form['action'] or "current_page",
+                    'method': form['method'] or "GET",
+                    'inputs': form['inputs']
                 })
             
-            # Extract navigation
-            nav_elements = self.driver.find_elements(By.TAG_NAME, "nav")
-            nav_elements.extend(self.driver.find_elements(By.CSS_SELECTOR, ".nav, .navbar, .menu"))
-            
-            for nav in nav_elements:
-                links = nav.find_elements(By.TAG_NAME, "a")
-                nav_links = []
-                for link in links:
-                    nav_links.append({
-                        'text': link.text,
-                        'href': link.get_attribute("href")
-                    })
-                page_data['navigation'].append(nav_links)
+            page_data['buttons'] = extracted['buttons']
+            page_data['navigation'] = extracted['navigation']
             
         except Exception as e:
             page_data['errors'].append(f"Extraction error: {str(e)}")
         
         return page_data
 
-def simple_AI_Function_Agent(prompt, model="llama-3.3-70b-versatile"):
+# Static instructions go first as system messages so providers with automatic prompt
+# caching can reuse the shared prefix; only the variable data follows in the user message
+_DESIGN_TESTS_SYSTEM_PROMPT = """
+You generate comprehensive test cases in JSON format from design comparison results between Figma designs and a live website.
+
+Please generate test cases in this JSON format that focus on:
+1. Visual regression testing
+2. Layout validation
+3. Component positioning
+4. Color accuracy
+5. Typography consistency
+6. Responsive design validation
+
+Include both automated visual tests and manual verification steps.
+
+{
+    "test_suites": [
+        {
+            "suite_name": "Visual Regression Tests",
+            "test_cases": [
+                {
+                    "name": "Verify homepage design matches Figma",
+                    "priority": "High",
+                    "type": "Visual",
+                    "description": "Compare homepage layout with Figma design",
+                    "preconditions": "Browser open, Figma reference available",
+                    "steps": [
+                        {"action": "navigate", "url": "homepage_url"},
+                        {"action": "capture_screenshot", "element": "body"},
+                        {"action": "compare_with_figma", "figma_page": "Homepage"}
+                    ],
+                    "expected_result": "Design matches Figma specifications within threshold"
+                }
+            ]
+        }
+    ]
+}
+"""
+
+_CRAWL_TESTS_SYSTEM_PROMPT = """
+You generate comprehensive test cases in JSON format from website crawl data.
+
+Generate test cases that cover:
+1. Navigation testing
+2. Form functionality
+3. Button interactions
+4. Page loading and content verification
+5. Error handling scenarios
+
+Format as JSON with test suites and individual test cases.
+"""
+
+_REQUIREMENTS_TESTS_SYSTEM_PROMPT = """
+You generate comprehensive test cases in JSON format from requirements.
+
+Create test suites with individual test cases that include:
+- Test name and description
+- Priority level
+- Test type (Functional, UI, Integration, etc.)
+- Preconditions
+- Detailed test steps
+- Expected results
+
+Format as valid JSON.
+"""
+
+_DESIGN_PROMPT_TMPL = """
+Design Issues Found:
+{summary}
+
+Overall Similarity Score: {score:.1%}
+Pages Analyzed: {pages}
+"""
+
+_CRAWL_PROMPT_TMPL = """
+Website crawl data:
+
+{summary}
+"""
+
+_MANUAL_PROMPT_TMPL = """
+Requirements:
+
+{requirements}
+"""
+
+def simple_AI_Function_Agent(prompt, model="llama-3.3-70b-versatile", system_prompt=None):
     """Core function to interface with the Groq API"""
     try:
         # Get API key from environment variable
@@ -834,8 +1354,11 @@ def simple_AI_Function_Agent(prompt, model="llama-3.3-70b-versatile"):
             return "Error: GROQ_API_KEY not found in environment variables"
             
         client = Groq(api_key=api_key)
+        messages = [{"role": "user", "content": prompt}]
+        if system_prompt:
+            messages.insert(0, {"role": "system", "content": system_prompt})
         chat_completion = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
+            messages=messages,
             model=model,
         )
         response = chat_completion.choices[0].message.content
@@ -843,40 +1366,248 @@ def simple_AI_Function_Agent(prompt, model="llama-3.3-70b-versatile"):
     except Exception as e:
         return f"An unexpected error occurred: {e}"
 
-def generate_test_cases_from_crawl(crawled_data, model):
-    """Generate test cases from crawled website data"""
-    if not crawled_data or not crawled_data['pages']:
-        return "No crawled data available"
+def simple_AI_Function_Agent_stream(prompt, model="llama-3.3-70b-versatile", system_prompt=None):
+    """Like simple_AI_Function_Agent, but yields the response text as it is generated.
+
+    Failures are raised rather than yielded, so a stream cut off partway can't be mistaken
+    for a complete response.
+    """
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise RuntimeError("GROQ_API_KEY not found in environment variables")
+    
+    client = Groq(api_key=api_key)
+    messages = [{"role": "user", "content": prompt}]
+    if system_prompt:
+        messages.insert(0, {"role": "system", "content": system_prompt})
+    for chunk in client.chat.completions.create(messages=messages, model=model, stream=True):
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
+_AI_RESPONSE_CACHE_SIZE = 64
+_ai_response_cache = OrderedDict()
+_ai_response_cache_lock = threading.Lock()
+
+def _is_ai_error(response):
+    return response.startswith(("Error:", "An unexpected error occurred"))
+
+def _ai_cache_get(key):
+    with _ai_response_cache_lock:
+        response = _ai_response_cache.get(key)
+        if response is not None:
+            _ai_response_cache.move_to_end(key)
+        return response
+
+def _ai_cache_put(key, response):
+    """Remember a successful response; error strings are never cached so the next call retries"""
+    if _is_ai_error(response):
+        return
+    with _ai_response_cache_lock:
+        _ai_response_cache[key] = response
+        if len(_ai_response_cache) > _AI_RESPONSE_CACHE_SIZE:
+            _ai_response_cache.popitem(last=False)
+
+def cached_ai_response(prompt, model="llama-3.3-70b-versatile", system_prompt=None):
+    """Groq response shared across reruns and sessions for an identical prompt, model and system prompt"""
+    key = _request_signature(prompt, model, system_prompt)
+    response = _ai_cache_get(key)
+    if response is None:
+        response = simple_AI_Function_Agent(prompt, model, system_prompt)
+        _ai_cache_put(key, response)
+    return response
+
+def simple_AI_Function_Agent_batch(prompts, model="llama-3.3-70b-versatile", system_prompt=None, max_workers=4):
+    """Send several prompts to the Groq API concurrently; responses come back in prompt order"""
+    if len(prompts) == 1:
+        return [cached_ai_response(prompts[0], model, system_prompt)]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(prompts))) as pool:
+        return list(pool.map(lambda prompt: cached_ai_response(prompt, model, system_prompt), prompts))
+
+def merge_test_suite_responses(responses):
+    """Combine batched JSON responses into one {"test_suites": [...]} document.
+
+    A single response is returned untouched; if any response isn't parseable JSON the raw
+    responses are concatenated instead so nothing generated is lost.
+    """
+    if len(responses) == 1:
+        return responses[0]
+    
+    test_suites = []
+    for response in responses:
+        start, end = response.find('{'), response.rfind('}')
+        try:
+            test_suites.extend(json.loads(response[start:end + 1])['test_suites'])
+        except (ValueError, KeyError, TypeError):
+            return "\n\n".join(responses)
+    return json.dumps({'test_suites': test_suites}, indent=2)
+
+def build_design_test_prompt(issues, results):
+    """Test-generation prompt for one group of design comparison issues"""
+    design_issues_summary = "\n".join([
+        f"- Page: {issue['page']}, Issue: {issue['type']}, Severity: {issue['severity']}, Description: {issue['description']}"
+        for issue in issues
+    ])
     
-    # Create summary of crawled data for prompt
-    pages_summary = []
+    return _DESIGN_PROMPT_TMPL.format(
+        summary=design_issues_summary, score=results['overall_score'], pages=results['pages_compared']
+    )
+
+def build_requirements_test_prompt(requirements):
+    """Test-generation prompt for a block of manually entered requirements"""
+    return _MANUAL_PROMPT_TMPL.format(requirements=requirements)
+
+def split_requirements(requirements, max_chars=4000):
+    """Group paragraphs of a requirements text into chunks of at most ~max_chars each"""
+    chunks, current, size = [], [], 0
+    for paragraph in re.split(r'\n\s*\n', requirements.strip()):
+        if current and size + len(paragraph) > max_chars:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += len(paragraph)
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+def build_crawl_test_prompt(crawled_data):
+    """Test-generation prompt summarizing the pages, forms and inputs of a crawl"""
+    # Create summary of crawled data for prompt; lines are joined once at the end
+    summary_lines = []
     for page in crawled_data['pages']:
-        summary = f"Page: {page['title']} ({page['url']})\n"
-        summary += f"Forms: {len(page['forms'])}, Buttons: {len(page['buttons'])}\n"
+        summary_lines.append(f"Page: {page['title']} ({page['url']})")
+        summary_lines.append(f"Forms: {len(page['forms'])}, Buttons: {len(page['buttons'])}")
         if page['forms']:
-            summary += "Form details:\n"
+            summary_lines.append("Form details:")
             for form in page['forms']:
-                summary += f"  - Action: {form['action']}, Method: {form['method']}\n"
-                for inp in form['inputs']:
-                    summary += f"    Input: {inp['type']} - {inp['name']}\n"
-        pages_summary.append(summary)
+                summary_lines.append(f"  - Action: {form['action']}, Method: {form['method']}")
+                summary_lines.extend(f"    Input: {inp['type']} - {inp['name']}" for inp in form['inputs'])
+        summary_lines.append("")
     
-    prompt = f"""
-Based on the following website crawl data, generate comprehensive test cases in JSON format:
-
-{chr(10).join(pages_summary)}
-
-Generate test cases that cover:
-1. Navigation testing
-2. Form functionality
-3. Button interactions
-4. Page loading and content verification
-5. Error handling scenarios
-
-Format as JSON with test suites and individual test cases.
-"""
+    return _CRAWL_PROMPT_TMPL.format(summary="\n".join(summary_lines))
+
+@st.cache_resource
+def get_figma_client(access_token):
+    """Shared Figma client per token so its file caches survive Streamlit reruns"""
+    return FigmaIntegration(access_token)
+
+@st.cache_resource
+def _shared_jira_client(server_url, email, api_token, project_key):
+    return EnhancedJiraIntegration(server_url, email, api_token, project_key)
+
+def get_jira_client(server_url, email, api_token, project_key):
+    """Shared Jira client per credential set, connected on first use; None if the connection fails"""
+    jira_client = _shared_jira_client(server_url, email, api_token, project_key)
+    # Failed connections aren't cached, so the next click retries
+    if jira_client.jira is None and not jira_client.connect():
+        return None
+    return jira_client
+
+def stream_test_cases(prompt, model, system_prompt=None, refresh_interval=0.1):
+    """Render a generation into a JSON code block as it streams in and return the full text.
+
+    Returns None if the stream fails; the partial text stays on screen but isn't cached.
+    """
+    placeholder = st.empty()
+    key = _request_signature(prompt, model, system_prompt)
+    response = _ai_cache_get(key)
+    if response is None:
+        parts = []
+        last_render = 0.0
+        try:
+            for delta in simple_AI_Function_Agent_stream(prompt, model, system_prompt):
+                parts.append(delta)
+                # Throttle redraws; each one ships the whole block over the websocket
+                if time.monotonic() - last_render >= refresh_interval:
+                    placeholder.code("".join(parts), language="json")
+                    last_render = time.monotonic()
+        except Exception as e:
+            placeholder.code("".join(parts), language="json")
+            st.error(f"Test case generation failed: {e}")
+            return None
+        response = "".join(parts)
+        _ai_cache_put(key, response)
+    placeholder.code(response, language="json")
+    return response
+
+def rollup_issues(issues):
+    """Merge each page's issues of one severity into a single ticket-ready issue with a table of findings.
+
+    A page with only one issue of a given severity keeps it as-is.
+    """
+    groups = {}
+    for issue in issues:
+        groups.setdefault((issue['page'], issue['severity']), []).append(issue)
     
-    return simple_AI_Function_Agent(prompt, model)
+    rolled_up = []
+    for group in groups.values():
+        if len(group) == 1:
+            rolled_up.append(group[0])
+            continue
+        # Jira wiki table rows; literal pipes in descriptions would split cells
+        rows = "\n".join(
+            "|{}|{}|".format(issue['type'], issue['description'].replace('|', '\\|')) for issue in group
+        )
+        rolled_up.append({
+            'page': group[0]['page'],
+            'type': 'grouped_differences',
+            'severity': group[0]['severity'],
+            'description': f"{len(group)} {group[0]['severity']}-severity differences on this page:\n||Type||Description||\n{rows}",
+            'figma_image': group[0].get('figma_image'),
+            'website_image': group[0].get('website_image')
+        })
+    return rolled_up
+
+def create_design_bugs_concurrently(jira_client, issues, max_workers=8):
+    """Create one design bug per issue on a thread pool, reporting progress as tickets land"""
+    tickets_created = []
+    if not issues:
+        return tickets_created
+    
+    progress = st.progress(0.0, text="Creating Jira tickets...")
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(issues)), initializer=_script_ctx_initializer()) as pool:
+        futures = [
+            pool.submit(jira_client.create_design_bug, issue['page'], issue,
+                        issue.get('figma_image'), issue.get('website_image'))
+            for issue in issues
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            ticket_key = future.result()
+            if ticket_key:
+                tickets_created.append(ticket_key)
+            progress.progress(done / len(futures), text=f"Created {len(tickets_created)} of {len(futures)} tickets")
+    progress.empty()
+    return tickets_created
+
+_CONFIG_ENV_VARS = ("GROQ_API_KEY", "FIGMA_ACCESS_TOKEN",
+                    "JIRA_SERVER_URL", "JIRA_EMAIL", "JIRA_API_TOKEN", "JIRA_PROJECT_KEY")
+
+@st.cache_resource
+def load_config(groq_key, figma_token, jira_server, jira_email, jira_token, jira_project):
+    """Resolved settings and derived checks, cached per distinct set of values so overrides refresh it"""
+    jira_missing = [name for name, value in zip(_CONFIG_ENV_VARS[2:], (jira_server, jira_email, jira_token, jira_project))
+                    if not value]
+    return types.SimpleNamespace(
+        groq_key=groq_key,
+        groq_configured=bool(groq_key),
+        figma_token=figma_token,
+        figma_configured=bool(figma_token),
+        jira_server=jira_server,
+        jira_email=jira_email,
+        jira_token=jira_token,
+        jira_project=jira_project,
+        jira_missing=jira_missing,
+        jira_configured=not jira_missing
+    )
+
+@st.cache_data
+def summarize_test_results(test_data):
+    """Total, pass rate and failed count for a results table; recomputed only when the table changes"""
+    # One array view of the column; counts come from boolean reductions, not filtered copies
+    status = test_data['Status'].to_numpy()
+    total_tests = len(status)
+    pass_rate = np.count_nonzero(status == 'PASS') / total_tests if total_tests else 0
+    return total_tests, pass_rate, int(np.isin(status, ['FAIL', 'ERROR']).sum())
 
 # Streamlit UI
 st.title("Advanced AI QA Automation with Figma Integration")
@@ -885,30 +1616,8 @@ st.markdown("**Web Crawling • Design Comparison • Test Generation • Jira I
 # Sidebar configuration
 st.sidebar.header("Configuration")
 
-# Check for environment variables
+# Check for environment variables (filled in once overrides below have been applied)
 env_status = st.sidebar.expander("Environment Status")
-with env_status:
-    groq_configured = "✅" if os.getenv("GROQ_API_KEY") else "❌"
-    figma_configured = "✅" if os.getenv("FIGMA_ACCESS_TOKEN") else "❌"
-    jira_configured = "✅" if all([
-        os.getenv("JIRA_SERVER_URL"),
-        os.getenv("JIRA_EMAIL"), 
-        os.getenv("JIRA_API_TOKEN"),
-        os.getenv("JIRA_PROJECT_KEY")
-    ]) else "❌"
-    
-    st.write(f"**Groq API:** {groq_configured}")
-    st.write(f"**Figma API:** {figma_configured}")
-    st.write(f"**Jira Integration:** {jira_configured}")
-    
-    if not os.getenv("GROQ_API_KEY"):
-        st.error("⚠️ GROQ_API_KEY not found in .env file")
-    
-    if not os.getenv("FIGMA_ACCESS_TOKEN"):
-        st.error("⚠️ FIGMA_ACCESS_TOKEN not found in .env file")
-    
-    if not jira_configured:
-        st.warning("⚠️ Jira credentials incomplete in .env file")
 
 # Override options (for testing/development only)
 with st.sidebar.expander("Development Override (Not Recommended)"):
@@ -937,6 +1646,22 @@ with st.sidebar.expander("Development Override (Not Recommended)"):
         os.environ["JIRA_PROJECT_KEY"] = override_jira_project
         st.success("Jira settings temporarily overridden")
 
+CONFIG = load_config(*map(os.getenv, _CONFIG_ENV_VARS))
+
+with env_status:
+    st.write(f"**Groq API:** {'✅' if CONFIG.groq_configured else '❌'}")
+    st.write(f"**Figma API:** {'✅' if CONFIG.figma_configured else '❌'}")
+    st.write(f"**Jira Integration:** {'✅' if CONFIG.jira_configured else '❌'}")
+    
+    if not CONFIG.groq_configured:
+        st.error("⚠️ GROQ_API_KEY not found in .env file")
+    
+    if not CONFIG.figma_configured:
+        st.error("⚠️ FIGMA_ACCESS_TOKEN not found in .env file")
+    
+    if not CONFIG.jira_configured:
+        st.warning("⚠️ Jira credentials incomplete in .env file")
+
 # Model and workflow selection
 st.sidebar.subheader("AI Configuration")
 models = ["llama-3.3-70b-versatile", "llama-3.1-70b-versatile", "mixtral-8x7b-32768"]
@@ -1000,7 +1725,7 @@ with tab2:
     st.header("Figma Design Comparison Testing")
     
     # Check if Figma is configured
-    figma_token = os.getenv("FIGMA_ACCESS_TOKEN")
+    figma_token = CONFIG.figma_token
     
     if not figma_token:
         st.error("Figma Access Token not configured. Please add FIGMA_ACCESS_TOKEN to your .env file.")
@@ -1024,7 +1749,7 @@ with tab2:
                 key="figma_file_id"
             )
             if st.button("Test Figma Access (Debug)", type="secondary"):
-                figma = FigmaIntegration(figma_token)
+                figma = get_figma_client(figma_token)
                 figma.test_token_and_file_access(figma_file_id)
             
             website_url = st.text_input(
@@ -1059,6 +1784,12 @@ with tab2:
                 screenshot_scale = st.selectbox("Screenshot Scale", [1, 2, 3], index=1, key="screenshot_scale")
             with col_c:
                 comparison_method = st.selectbox("Comparison Method", ["structural", "pixel_perfect"], key="comparison_method")
+            reuse_screenshot = st.checkbox(
+                "Reuse website screenshot from the last 10 minutes",
+                value=False,
+                help="Skip reloading the page if the exact same URL was captured recently",
+                key="reuse_screenshot"
+            )
         
         if st.button("Start Design Comparison", type="primary"):
             if not figma_file_id or not website_url:
@@ -1067,7 +1798,7 @@ with tab2:
                 with st.spinner("Performing design comparison... This may take several minutes."):
                     try:
                         # Initialize Figma integration
-                        figma = FigmaIntegration(figma_token)
+                        figma = get_figma_client(figma_token)
                         
                         # Initialize design comparison tester
                         comparison_tester = DesignComparisonTester(figma)
@@ -1081,101 +1812,100 @@ with tab2:
                         results = comparison_tester.perform_design_comparison(
                             figma_file_id, 
                             website_url, 
-                            pages_filter
+                            pages_filter,
+                            reuse_screenshot=reuse_screenshot
                         )
                         
                         if results:
                             st.session_state['design_comparison_results'] = results
-                            
-                            # Display summary
-                            st.success(f"Design comparison completed!")
-                            
-                            col1, col2, col3, col4 = st.columns(4)
-                            with col1:
-                                st.metric("Overall Similarity", f"{results['overall_score']:.1%}")
-                            with col2:
-                                st.metric("Pages Compared", results['pages_compared'])
-                            with col3:
-                                st.metric("Issues Found", len(results['issues_found']))
-                            with col4:
-                                status = "Pass" if results['overall_score'] >= comparison_threshold else "Fail"
-                                st.metric("Status", status)
-                            
-                            # Display detailed results
-                            st.subheader("Comparison Details")
-                            
-                            for detail in results['comparison_details']:
-                                with st.expander(f"{detail['page_name']} (Similarity: {detail['similarity_score']:.1%})"):
-                                    
-                                    # Show images side by side
-                                    img_col1, img_col2, img_col3 = st.columns(3)
-                                    
-                                    with img_col1:
-                                        st.subheader("Figma Design")
-                                        figma_img_data = base64.b64decode(detail['figma_image'])
-                                        st.image(figma_img_data, use_container_width=True)
-                                    
-                                    with img_col2:
-                                        st.subheader("Website Screenshot")
-                                        website_img_data = base64.b64decode(detail['website_image'])
-                                        st.image(website_img_data, use_container_width=True)
-                                    
-                                    with img_col3:
-                                        if detail['comparison_image']:
-                                            st.subheader("Difference Map")
-                                            comparison_img_data = base64.b64decode(detail['comparison_image'])
-                                            st.image(comparison_img_data, use_container_width=True)
-                                    
-                                    # Show differences found
-                                    if detail['differences']:
-                                        st.subheader("Issues Detected")
-                                        for diff in detail['differences']:
-                                            severity_color = "High" if diff['severity'] == 'high' else "Medium"
-                                            st.write(f"**{severity_color} - {diff['type'].title()}**: {diff['description']}")
-                            
-                            # Auto-create Jira tickets option
-                            if results['issues_found'] and all([
-                                os.getenv("JIRA_SERVER_URL"),
-                                os.getenv("JIRA_EMAIL"),
-                                os.getenv("JIRA_API_TOKEN"),
-                                os.getenv("JIRA_PROJECT_KEY")
-                            ]):
-                                st.subheader("Jira Integration")
-                                if st.button("Create Jira Tickets for Issues Found", type="secondary"):
-                                    with st.spinner("Creating Jira tickets..."):
-                                        jira_client = EnhancedJiraIntegration(
-                                            os.getenv("JIRA_SERVER_URL"),
-                                            os.getenv("JIRA_EMAIL"),
-                                            os.getenv("JIRA_API_TOKEN"),
-                                            os.getenv("JIRA_PROJECT_KEY")
-                                        )
-                                        
-                                        if jira_client.connect():
-                                            tickets_created = []
-                                            for issue in results['issues_found']:
-                                                ticket_key = jira_client.create_design_bug(
-                                                    issue['page'],
-                                                    issue,
-                                                    issue.get('figma_image'),
-                                                    issue.get('website_image')
-                                                )
-                                                if ticket_key:
-                                                    tickets_created.append(ticket_key)
-                                            
-                                            if tickets_created:
-                                                st.success(f"Created {len(tickets_created)} Jira tickets!")
-                                                for ticket in tickets_created:
-                                                    st.write(f"- {ticket}")
-                                            else:
-                                                st.error("Failed to create Jira tickets")
-                                        else:
-                                            st.error("Failed to connect to Jira")
+                            st.success("Design comparison completed!")
                         else:
                             st.error("Design comparison failed. Please check your Figma File ID and try again.")
                     
                     except Exception as e:
                         st.error(f"Design comparison error: {e}")
                         st.exception(e)
+        
+        # Rendered from session state so the results (and their download and Jira buttons)
+        # survive the rerun those buttons trigger
+        results = st.session_state.get('design_comparison_results')
+        if results:
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Overall Similarity", f"{results['overall_score']:.1%}")
+            with col2:
+                st.metric("Pages Compared", results['pages_compared'])
+            with col3:
+                st.metric("Issues Found", len(results['issues_found']))
+            with col4:
+                status = "Pass" if results['overall_score'] >= comparison_threshold else "Fail"
+                st.metric("Status", status)
+            
+            # Display detailed results
+            st.subheader("Comparison Details")
+            
+            for detail in results['comparison_details']:
+                with st.expander(f"{detail['page_name']} (Similarity: {detail['similarity_score']:.1%})"):
+                    
+                    # Show images side by side
+                    img_col1, img_col2, img_col3 = st.columns(3)
+                    
+                    # Thumbnails in the grid; full-size PNGs are only fetched on download
+                    with img_col1:
+                        st.subheader("Figma Design")
+                        st.image(detail['figma_thumb'], use_container_width=True)
+                        st.download_button("Download full size", detail['figma_image_bytes'],
+                                           file_name=f"figma_{detail['page_id']}.png", mime="image/png",
+                                           key=f"full_figma_{detail['page_id']}")
+                    
+                    with img_col2:
+                        st.subheader("Website Screenshot")
+                        st.image(detail['website_thumb'], use_container_width=True)
+                        st.download_button("Download full size", detail['website_image_bytes'],
+                                           file_name=f"website_{detail['page_id']}.png", mime="image/png",
+                                           key=f"full_website_{detail['page_id']}")
+                    
+                    with img_col3:
+                        if detail['comparison_image_bytes']:
+                            st.subheader("Difference Map")
+                            st.image(detail['comparison_thumb'], use_container_width=True)
+                            st.download_button("Download full size", detail['comparison_image_bytes'],
+                                               file_name=f"diff_{detail['page_id']}.png", mime="image/png",
+                                               key=f"full_diff_{detail['page_id']}")
+                    
+                    # Show differences found
+                    if detail['differences']:
+                        st.subheader("Issues Detected")
+                        for diff in detail['differences']:
+                            severity_color = "High" if diff['severity'] == 'high' else "Medium"
+                            st.write(f"**{severity_color} - {diff['type'].title()}**: {diff['description']}")
+            
+            # Auto-create Jira tickets option
+            if results['issues_found'] and CONFIG.jira_configured:
+                st.subheader("Jira Integration")
+                if st.button("Create Jira Tickets for Issues Found", type="secondary"):
+                    with st.spinner("Creating Jira tickets..."):
+                        jira_client = get_jira_client(
+                            CONFIG.jira_server,
+                            CONFIG.jira_email,
+                            CONFIG.jira_token,
+                            CONFIG.jira_project
+                        )
+                        
+                        if jira_client:
+                            # One ticket per page and severity
+                            tickets_created = create_design_bugs_concurrently(
+                                jira_client, rollup_issues(results['issues_found'])
+                            )
+                            
+                            if tickets_created:
+                                st.success(f"Created {len(tickets_created)} Jira tickets!")
+                                for ticket in tickets_created:
+                                    st.write(f"- {ticket}")
+                            else:
+                                st.error("Failed to create Jira tickets")
+                        else:
+                            st.error("Failed to connect to Jira")
 
 with tab3:
     st.header("AI Test Case Generation")
@@ -1194,60 +1924,23 @@ with tab3:
             if st.button("Generate Test Cases from Design Issues", type="primary"):
                 with st.spinner("AI is generating design-focused test cases..."):
                     
-                    # Create prompt for design-specific test cases
-                    design_issues_summary = "\n".join([
-                        f"- Page: {issue['page']}, Issue: {issue['type']}, Severity: {issue['severity']}, Description: {issue['description']}"
-                        for issue in results['issues_found']
-                    ])
-                    
-                    prompt = f"""
-Based on the following design comparison results between Figma designs and live website, generate comprehensive test cases in JSON format.
-
-Design Issues Found:
-{design_issues_summary}
-
-Overall Similarity Score: {results['overall_score']:.1%}
-Pages Analyzed: {results['pages_compared']}
-
-Please generate test cases in this JSON format that focus on:
-1. Visual regression testing
-2. Layout validation
-3. Component positioning
-4. Color accuracy
-5. Typography consistency
-6. Responsive design validation
-
-Include both automated visual tests and manual verification steps.
-
-{{
-    "test_suites": [
-        {{
-            "suite_name": "Visual Regression Tests",
-            "test_cases": [
-                {{
-                    "name": "Verify homepage design matches Figma",
-                    "priority": "High",
-                    "type": "Visual",
-                    "description": "Compare homepage layout with Figma design",
-                    "preconditions": "Browser open, Figma reference available",
-                    "steps": [
-                        {{"action": "navigate", "url": "homepage_url"}},
-                        {{"action": "capture_screenshot", "element": "body"}},
-                        {{"action": "compare_with_figma", "figma_page": "Homepage"}}
-                    ],
-                    "expected_result": "Design matches Figma specifications within threshold"
-                }}
-            ]
-        }}
-    ]
-}}
-"""
-                    
-                    test_cases = simple_AI_Function_Agent(prompt, selected_model)
-                    st.session_state['generated_tests'] = test_cases
-                    
-                    st.success("Design-focused test cases generated successfully!")
-                    st.code(test_cases, language="json")
+                    # One prompt per group of issues, sent concurrently and merged back together
+                    # A single prompt streams into the page as it is generated
+                    issues = results['issues_found']
+                    prompts = [
+                        build_design_test_prompt(issues[i:i + 10], results)
+                        for i in range(0, max(len(issues), 1), 10)
+                    ]
+                    if len(prompts) == 1:
+                        test_cases = stream_test_cases(prompts[0], selected_model, _DESIGN_TESTS_SYSTEM_PROMPT)
+                    else:
+                        test_cases = merge_test_suite_responses(simple_AI_Function_Agent_batch(
+                            prompts, selected_model, _DESIGN_TESTS_SYSTEM_PROMPT
+                        ))
+                        st.code(test_cases, language="json")
+                    if test_cases is not None:
+                        st.session_state['generated_tests'] = test_cases
+                        st.success("Design-focused test cases generated successfully!")
         else:
             st.warning("Please perform a design comparison first in the Design Comparison tab.")
     
@@ -1257,12 +1950,14 @@ Include both automated visual tests and manual verification steps.
             
             if st.button("Generate Test Cases from Crawl", type="primary"):
                 with st.spinner("AI is generating comprehensive test cases..."):
-                    # Use existing function
-                    test_cases = generate_test_cases_from_crawl(st.session_state['crawled_data'], selected_model)
-                    st.session_state['generated_tests'] = test_cases
-                    
-                    st.success("Test cases generated successfully!")
-                    st.code(test_cases, language="json")
+                    test_cases = stream_test_cases(
+                        build_crawl_test_prompt(st.session_state['crawled_data']),
+                        selected_model,
+                        _CRAWL_TESTS_SYSTEM_PROMPT
+                    )
+                    if test_cases is not None:
+                        st.session_state['generated_tests'] = test_cases
+                        st.success("Test cases generated successfully!")
         else:
             st.warning("Please crawl a website first in the Web Crawling tab.")
     
@@ -1279,25 +1974,18 @@ Include both automated visual tests and manual verification steps.
         
         if manual_requirements and st.button("Generate Test Cases from Text"):
             with st.spinner("Generating test cases from your requirements..."):
-                prompt = f"""
-Generate comprehensive test cases in JSON format based on these requirements:
-
-{manual_requirements}
-
-Create test suites with individual test cases that include:
-- Test name and description
-- Priority level
-- Test type (Functional, UI, Integration, etc.)
-- Preconditions
-- Detailed test steps
-- Expected results
-
-Format as valid JSON.
-"""
-                test_cases = simple_AI_Function_Agent(prompt, selected_model)
-                st.session_state['generated_tests'] = test_cases
-                st.success("Test cases generated from manual input!")
-                st.code(test_cases, language="json")
+                # Long requirement documents are split by paragraph and generated in parallel
+                prompts = [build_requirements_test_prompt(chunk) for chunk in split_requirements(manual_requirements)]
+                if len(prompts) == 1:
+                    test_cases = stream_test_cases(prompts[0], selected_model, _REQUIREMENTS_TESTS_SYSTEM_PROMPT)
+                else:
+                    test_cases = merge_test_suite_responses(simple_AI_Function_Agent_batch(
+                        prompts, selected_model, _REQUIREMENTS_TESTS_SYSTEM_PROMPT
+                    ))
+                    st.code(test_cases, language="json")
+                if test_cases is not None:
+                    st.session_state['generated_tests'] = test_cases
+                    st.success("Test cases generated from manual input!")
 
 with tab4:
     st.header("Automated Test Execution")
@@ -1318,7 +2006,7 @@ with tab4:
         
         if st.button("Execute Test Suite", type="primary"):
             # Check if Groq API is configured
-            if not os.getenv("GROQ_API_KEY"):
+            if not CONFIG.groq_configured:
                 st.error("Groq API key not configured. Please check your .env file.")
             else:
                 with st.spinner("Executing automated tests..."):
@@ -1345,35 +2033,42 @@ with tab4:
                         ]
                     }
                     
+                    import pandas as pd  # only needed once a suite is executed
                     results_df = pd.DataFrame(results_data)
                     st.dataframe(results_df, use_container_width=True)
                     
-                    # Summary metrics
+                    # Summary metrics from a single pass over the status column
+                    status_counts = results_df['Status'].value_counts()
                     col1, col2, col3, col4 = st.columns(4)
                     with col1:
                         st.metric("Total Tests", len(results_df))
                     with col2:
-                        st.metric("Passed", len(results_df[results_df['Status'] == 'PASS']))
+                        st.metric("Passed", int(status_counts.get('PASS', 0)))
                     with col3:
-                        st.metric("Failed", len(results_df[results_df['Status'] == 'FAIL']))
+                        st.metric("Failed", int(status_counts.get('FAIL', 0)))
                     with col4:
-                        st.metric("Errors", len(results_df[results_df['Status'] == 'ERROR']))
+                        st.metric("Errors", int(status_counts.get('ERROR', 0)))
                         
                     # Store results for bug management
                     st.session_state['test_execution_results'] = results_df
     else:
         st.warning("Please generate test cases first in the Test Generation tab.")
 
-with tab5:
+# Bug Management only reads results produced by other tabs, so its widgets (manual bug
+# form, ticket buttons) can rerun just this tab; st.fragment needs Streamlit >= 1.37
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
+@_fragment
+def render_bug_management():
     st.header("Enhanced Bug Management & Jira Integration")
     
     # Check Jira configuration from environment
-    jira_server = os.getenv("JIRA_SERVER_URL")
-    jira_email = os.getenv("JIRA_EMAIL")
-    jira_token = os.getenv("JIRA_API_TOKEN")
-    jira_project = os.getenv("JIRA_PROJECT_KEY")
+    jira_server = CONFIG.jira_server
+    jira_email = CONFIG.jira_email
+    jira_token = CONFIG.jira_token
+    jira_project = CONFIG.jira_project
     
-    if all([jira_server, jira_email, jira_token, jira_project]):
+    if CONFIG.jira_configured:
         st.success("Jira configuration loaded from .env file!")
         
         # Display current configuration (masked for security)
@@ -1398,21 +2093,18 @@ with tab5:
                     
                     if st.button("Auto-Create Jira Bugs for Failed Tests"):
                         with st.spinner("Creating Jira tickets for failed tests..."):
-                            jira_client = EnhancedJiraIntegration(jira_server, jira_email, jira_token, jira_project)
-                            if jira_client.connect():
-                                bugs_created = []
-                                for _, test in failed_tests.iterrows():
-                                    issue_details = {
+                            jira_client = get_jira_client(jira_server, jira_email, jira_token, jira_project)
+                            if jira_client:
+                                failure_issues = [
+                                    {
+                                        'page': f"Test: {test['Test Case']}",
                                         'type': 'test_failure',
                                         'severity': 'high' if test['Status'] == 'ERROR' else 'medium',
                                         'description': f"Test '{test['Test Case']}' failed: {test['Error Message']}"
                                     }
-                                    bug_key = jira_client.create_design_bug(
-                                        f"Test: {test['Test Case']}", 
-                                        issue_details
-                                    )
-                                    if bug_key:
-                                        bugs_created.append(bug_key)
+                                    for _, test in failed_tests.iterrows()
+                                ]
+                                bugs_created = create_design_bugs_concurrently(jira_client, failure_issues)
                                 
                                 if bugs_created:
                                     st.success(f"Created {len(bugs_created)} Jira tickets!")
@@ -1436,31 +2128,22 @@ with tab5:
                 if design_results['issues_found']:
                     st.write(f"Found {len(design_results['issues_found'])} design issues:")
                     
-                    # Display issues in a table
-                    issues_data = {
-                        'Page': [issue['page'] for issue in design_results['issues_found']],
-                        'Issue Type': [issue['type'] for issue in design_results['issues_found']],
-                        'Severity': [issue['severity'] for issue in design_results['issues_found']],
-                        'Description': [issue['description'] for issue in design_results['issues_found']]
-                    }
-                    
-                    issues_df = pd.DataFrame(issues_data)
+                    # Display issues in a table, built from the issue dicts in one pass
+                    import pandas as pd  # deferred until there are issues to tabulate
+                    issues_df = pd.DataFrame.from_records(
+                        design_results['issues_found'], columns=['page', 'type', 'severity', 'description']
+                    )
+                    issues_df.columns = ['Page', 'Issue Type', 'Severity', 'Description']
                     st.dataframe(issues_df, use_container_width=True)
                     
                     if st.button("Create Jira Tickets for Design Issues"):
                         with st.spinner("Creating Jira tickets for design issues..."):
-                            jira_client = EnhancedJiraIntegration(jira_server, jira_email, jira_token, jira_project)
-                            if jira_client.connect():
-                                tickets_created = []
-                                for issue in design_results['issues_found']:
-                                    ticket_key = jira_client.create_design_bug(
-                                        issue['page'],
-                                        issue,
-                                        issue.get('figma_image'),
-                                        issue.get('website_image')
-                                    )
-                                    if ticket_key:
-                                        tickets_created.append(ticket_key)
+                            jira_client = get_jira_client(jira_server, jira_email, jira_token, jira_project)
+                            if jira_client:
+                                # One ticket per page and severity
+                                tickets_created = create_design_bugs_concurrently(
+                                    jira_client, rollup_issues(design_results['issues_found'])
+                                )
                                 
                                 if tickets_created:
                                     st.success(f"Created {len(tickets_created)} design issue tickets!")
@@ -1497,8 +2180,8 @@ with tab5:
             if st.button("Create Manual Bug in Jira"):
                 if bug_summary and bug_description:
                     with st.spinner("Creating manual bug in Jira..."):
-                        jira_client = EnhancedJiraIntegration(jira_server, jira_email, jira_token, jira_project)
-                        if jira_client.connect():
+                        jira_client = get_jira_client(jira_server, jira_email, jira_token, jira_project)
+                        if jira_client:
                             # Use enhanced bug creation method
                             bug_key = jira_client.create_bug(
                                 bug_summary,
@@ -1514,17 +2197,11 @@ with tab5:
                                 # Attach screenshot if provided
                                 if uploaded_screenshot and bug_key:
                                     try:
-                                        # Save uploaded file temporarily
-                                        screenshot_filename = f"manual_screenshot_{bug_key}.png"
-                                        with open(screenshot_filename, 'wb') as f:
-                                            f.write(uploaded_screenshot.getvalue())
-                                        
-                                        jira_client.jira.add_attachment(
-                                            issue=bug_key, 
-                                            attachment=screenshot_filename, 
-                                            filename=f"Screenshot_{bug_key}.png"
+                                        # Upload straight from memory, no temp file
+                                        jira_client.add_attachments(
+                                            bug_key,
+                                            [(f"Screenshot_{bug_key}.png", uploaded_screenshot.getvalue())]
                                         )
-                                        os.remove(screenshot_filename)  # Clean up
                                         st.success("Screenshot attached successfully!")
                                     except Exception as e:
                                         st.warning(f"Bug created but screenshot attachment failed: {e}")
@@ -1537,13 +2214,10 @@ with tab5:
     else:
         st.warning("Jira not configured. Please set up your .env file with Jira credentials.")
         
-        missing_vars = []
-        if not jira_server: missing_vars.append("JIRA_SERVER_URL")
-        if not jira_email: missing_vars.append("JIRA_EMAIL") 
-        if not jira_token: missing_vars.append("JIRA_API_TOKEN")
-        if not jira_project: missing_vars.append("JIRA_PROJECT_KEY")
-        
-        st.error(f"Missing environment variables: {', '.join(missing_vars)}")
+        st.error(f"Missing environment variables: {', '.join(CONFIG.jira_missing)}")
+
+with tab5:
+    render_bug_management()
 
 with tab6:
     st.header("Results Dashboard")
@@ -1556,8 +2230,8 @@ with tab6:
         if 'crawled_data' in st.session_state:
             crawl_data = st.session_state['crawled_data']
             st.metric("Pages Crawled", len(crawl_data['pages']))
-            st.metric("Forms Found", sum(len(page['forms']) for page in crawl_data['pages']))
-            st.metric("Buttons Found", sum(len(page['buttons']) for page in crawl_data['pages']))
+            st.metric("Forms Found", crawl_data['forms_count'])
+            st.metric("Buttons Found", crawl_data['buttons_count'])
         else:
             st.info("No crawling data available")
     
@@ -1574,9 +2248,9 @@ with tab6:
     with col3:
         st.subheader("Test Execution")
         if 'test_execution_results' in st.session_state:
-            test_data = st.session_state['test_execution_results']
-            st.metric("Total Tests", len(test_data))
-            st.metric("Pass Rate", f"{len(test_data[test_data['Status'] == 'PASS']) / len(test_data):.1%}")
-            st.metric("Failed Tests", len(test_data[test_data['Status'].isin(['FAIL', 'ERROR'])]))
+            total_tests, pass_rate, failed_tests = summarize_test_results(st.session_state['test_execution_results'])
+            st.metric("Total Tests", total_tests)
+            st.metric("Pass Rate", f"{pass_rate:.1%}")
+            st.metric("Failed Tests", failed_tests)
         else:
             st.info("No test execution data available")
\ No newline at end of file
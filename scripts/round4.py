@@ -1,36 +1,30 @@
 import streamlit as st
 import os
+import sys
+import atexit
 import requests
-from groq import Groq
-import PyPDF2
-import docx
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from io import BytesIO
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+# Only the exception classes load eagerly; the webdriver, Groq, Jira and OpenCV stacks are
+# imported inside the functions that use them so tabs that never touch them don't pay for them
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException, SessionNotCreatedException
 import json
 import time
 import traceback
 from datetime import datetime
-from jira import JIRA
-import pandas as pd
 from dotenv import load_dotenv
-from PIL import Image, ImageDraw, ImageChops
 import base64
-import cv2
-import numpy as np
-from skimage.metrics import structural_similarity as ssim
-import matplotlib.pyplot as plt
 import re
 import tempfile
 import shutil
 import logging
+import threading
+import queue
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 
 # Load environment variables
@@ -40,6 +34,68 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fixed for the life of the process; shown in System Status
+_PY_VER = sys.version.split()[0]
+_ST_VER = st.__version__
+_ENV_VARS = (
+    'GROQ_API_KEY',
+    'FIGMA_ACCESS_TOKEN',
+    'JIRA_SERVER_URL',
+    'JIRA_EMAIL',
+    'JIRA_API_TOKEN',
+    'JIRA_PROJECT_KEY'
+)
+
+@lru_cache(maxsize=None)
+def _env(key):
+    """Environment lookup memoized for the process; call _env.cache_clear() after reloading .env"""
+    return os.environ.get(key)
+
+
+# ChromeDriverManager().install() checks the network/driver cache on every call; resolve the
+# driver once per process and remember the path on disk so restarts skip the lookup as well
+_CHROMEDRIVER_PATH = None
+_CHROMEDRIVER_LOCK = threading.Lock()
+_CHROMEDRIVER_PATH_FILE = os.path.join(os.path.expanduser("~"), ".cache", "qa-brother", "chromedriver")
+
+
+def _get_chromedriver_path(refresh=False):
+    """Return the ChromeDriver executable path, installing it only when no known path exists"""
+    global _CHROMEDRIVER_PATH
+    with _CHROMEDRIVER_LOCK:
+        if not refresh:
+            if _CHROMEDRIVER_PATH and os.path.exists(_CHROMEDRIVER_PATH):
+                return _CHROMEDRIVER_PATH
+            try:
+                with open(_CHROMEDRIVER_PATH_FILE) as f:
+                    cached_path = f.read().strip()
+                if cached_path and os.path.exists(cached_path):
+                    _CHROMEDRIVER_PATH = cached_path
+                    return cached_path
+            except OSError:
+                pass
+        
+        from webdriver_manager.chrome import ChromeDriverManager
+        _CHROMEDRIVER_PATH = ChromeDriverManager().install()
+        try:
+            os.makedirs(os.path.dirname(_CHROMEDRIVER_PATH_FILE), exist_ok=True)
+            with open(_CHROMEDRIVER_PATH_FILE, "w") as f:
+                f.write(_CHROMEDRIVER_PATH)
+        except OSError as e:
+            logger.warning(f"Could not persist ChromeDriver path: {e}")
+        return _CHROMEDRIVER_PATH
+
+
+def _launch_chrome(chrome_options):
+    """Start Chrome on the cached driver, re-resolving it once if Chrome updated past that driver"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    try:
+        return webdriver.Chrome(service=Service(_get_chromedriver_path()), options=chrome_options)
+    except SessionNotCreatedException:
+        logger.info("Cached ChromeDriver rejected by Chrome, resolving a matching driver")
+        return webdriver.Chrome(service=Service(_get_chromedriver_path(refresh=True)), options=chrome_options)
+
 class ConfigurationValidator:
     """Validate and manage configuration settings"""
     
@@ -54,7 +110,7 @@ class ConfigurationValidator:
         }
         
         # Validate Groq API
-        groq_key = os.getenv("GROQ_API_KEY")
+        groq_key = _env("GROQ_API_KEY")
         if groq_key and len(groq_key) > 50:
             validation_results['groq']['status'] = True
             validation_results['groq']['message'] = "API key configured"
@@ -62,7 +118,7 @@ class ConfigurationValidator:
             validation_results['groq']['message'] = "Missing or invalid GROQ_API_KEY"
         
         # Validate Figma API
-        figma_token = os.getenv("FIGMA_ACCESS_TOKEN")
+        figma_token = _env("FIGMA_ACCESS_TOKEN")
         if figma_token and len(figma_token) > 40:
             validation_results['figma']['status'] = True
             validation_results['figma']['message'] = "Access token configured"
@@ -71,7 +127,7 @@ class ConfigurationValidator:
         
         # Validate Jira configuration
         jira_required = ['JIRA_SERVER_URL', 'JIRA_EMAIL', 'JIRA_API_TOKEN', 'JIRA_PROJECT_KEY']
-        jira_values = [os.getenv(key) for key in jira_required]
+        jira_values = [_env(key) for key in jira_required]
         
         if all(jira_values):
             validation_results['jira']['status'] = True
@@ -80,74 +136,346 @@ class ConfigurationValidator:
             missing = [key for key, val in zip(jira_required, jira_values) if not val]
             validation_results['jira']['message'] = f"Missing: {', '.join(missing)}"
         
-        # Validate Chrome driver availability
-        try:
-            chrome_options = Options()
-            chrome_options.add_argument("--headless")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            driver.quit()
-            
-            validation_results['chrome']['status'] = True
-            validation_results['chrome']['message'] = "Chrome driver available"
-        except Exception as e:
-            validation_results['chrome']['message'] = f"Chrome driver issue: {str(e)[:100]}"
+        # Validate Chrome driver availability (launches Chrome, so cached separately)
+        validation_results['chrome'] = check_chrome_driver()
         
         return validation_results
     
     @staticmethod
     def test_api_connections():
         """Test actual API connections"""
-        connection_results = {}
-        
-        # Test Groq API
-        try:
-            client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-            response = client.chat.completions.create(
-                messages=[{"role": "user", "content": "Test connection"}],
-                model="llama-3.3-70b-versatile",
-                max_tokens=10
-            )
-            connection_results['groq'] = {'status': True, 'message': 'Connection successful'}
-        except Exception as e:
-            connection_results['groq'] = {'status': False, 'message': f'Connection failed: {str(e)[:100]}'}
-        
-        # Test Figma API
-        try:
-            headers = {"X-Figma-Token": os.getenv("FIGMA_ACCESS_TOKEN")}
-            response = requests.get("https://api.figma.com/v1/me", headers=headers, timeout=10)
-            if response.status_code == 200:
-                user_data = response.json()
-                connection_results['figma'] = {
-                    'status': True, 
-                    'message': f"Connected as: {user_data.get('email', 'Unknown')}"
-                }
-            else:
-                connection_results['figma'] = {
-                    'status': False, 
-                    'message': f'API error: {response.status_code}'
-                }
-        except Exception as e:
-            connection_results['figma'] = {'status': False, 'message': f'Connection failed: {str(e)[:100]}'}
+        return probe_api_connections(
+            _env("GROQ_API_KEY"),
+            _env("FIGMA_ACCESS_TOKEN"),
+            _env("JIRA_SERVER_URL"),
+            _env("JIRA_EMAIL"),
+            _env("JIRA_API_TOKEN")
+        )
+
+
+@st.cache_data(ttl=600, show_spinner="Checking Chrome driver...")
+def check_chrome_driver():
+    """Check a pooled Chrome out and back in to confirm it works; cached so sidebar reruns skip it"""
+    try:
+        with borrow_driver():
+            pass
         
-        # Test Jira API
-        try:
-            jira_client = JIRA(
-                server=os.getenv("JIRA_SERVER_URL"),
-                basic_auth=(os.getenv("JIRA_EMAIL"), os.getenv("JIRA_API_TOKEN"))
-            )
-            user = jira_client.myself()
-            connection_results['jira'] = {
-                'status': True,
-                'message': f"Connected as: {user['displayName']}"
+        return {'status': True, 'message': "Chrome driver available"}
+    except Exception as e:
+        return {'status': False, 'message': f"Chrome driver issue: {str(e)[:100]}"}
+
+
+@lru_cache(maxsize=4)
+def _get_groq_client(api_key):
+    """One Groq client (and its HTTP pool) per API key"""
+    from groq import Groq
+    return Groq(api_key=api_key)
+
+
+@lru_cache(maxsize=4)
+def _get_jira_client(server, email, api_token):
+    """One authenticated JIRA session per set of credentials; failed logins are not cached"""
+    from jira import JIRA
+    return JIRA(server=server, basic_auth=(email, api_token))
+
+
+def _probe_groq(api_key):
+    """Send a tiny completion to confirm the Groq key works"""
+    try:
+        client = _get_groq_client(api_key)
+        response = client.chat.completions.create(
+            messages=[{"role": "user", "content": "Test connection"}],
+            model="llama-3.3-70b-versatile",
+            max_tokens=10
+        )
+        return 'groq', {'status': True, 'message': 'Connection successful'}
+    except Exception as e:
+        return 'groq', {'status': False, 'message': f'Connection failed: {str(e)[:100]}'}
+
+
+def _probe_figma(access_token):
+    """Call Figma's /me endpoint with the access token"""
+    try:
+        headers = {"X-Figma-Token": access_token}
+        response = requests.get("https://api.figma.com/v1/me", headers=headers, timeout=10)
+        if response.status_code == 200:
+            user_data = response.json()
+            return 'figma', {
+                'status': True, 
+                'message': f"Connected as: {user_data.get('email', 'Unknown')}"
             }
-        except Exception as e:
-            connection_results['jira'] = {'status': False, 'message': f'Connection failed: {str(e)[:100]}'}
-        
-        return connection_results
+        return 'figma', {
+            'status': False, 
+            'message': f'API error: {response.status_code}'
+        }
+    except Exception as e:
+        return 'figma', {'status': False, 'message': f'Connection failed: {str(e)[:100]}'}
+
+
+def _probe_jira(server, email, api_token):
+    """Fetch the current Jira user to confirm the credentials"""
+    try:
+        jira_client = _get_jira_client(server, email, api_token)
+        user = jira_client.myself()
+        return 'jira', {
+            'status': True,
+            'message': f"Connected as: {user['displayName']}"
+        }
+    except Exception as e:
+        return 'jira', {'status': False, 'message': f'Connection failed: {str(e)[:100]}'}
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def probe_api_connections(groq_key, figma_token, jira_server, jira_email, jira_token):
+    """Live Groq/Figma/Jira checks, cached per set of credentials for a few minutes"""
+    # The probes are independent network calls; run them side by side
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [
+            executor.submit(_probe_groq, groq_key),
+            executor.submit(_probe_figma, figma_token),
+            executor.submit(_probe_jira, jira_server, jira_email, jira_token),
+        ]
+        connection_results = dict(future.result() for future in futures)
+    
+    return connection_results
+
+
+# SSIM constants for 8-bit images (Wang et al. 2004)
+_SSIM_C1 = (0.01 * 255) ** 2
+_SSIM_C2 = (0.03 * 255) ** 2
+
+
+def fast_ssim(a, b):
+    """Mean SSIM of two same-sized images, built from OpenCV Gaussian blurs"""
+    import cv2
+    import numpy as np
+    if a.ndim == 3:
+        a = cv2.cvtColor(a, cv2.COLOR_BGR2GRAY)
+    if b.ndim == 3:
+        b = cv2.cvtColor(b, cv2.COLOR_BGR2GRAY)
+    a = a.astype(np.float32)
+    b = b.astype(np.float32)
+    
+    mu1 = cv2.GaussianBlur(a, (11, 11), 1.5)
+    mu2 = cv2.GaussianBlur(b, (11, 11), 1.5)
+    mu1_sq = mu1 * mu1
+    mu2_sq = mu2 * mu2
+    mu1_mu2 = mu1 * mu2
+    
+    sigma1_sq = cv2.GaussianBlur(a * a, (11, 11), 1.5) - mu1_sq
+    sigma2_sq = cv2.GaussianBlur(b * b, (11, 11), 1.5) - mu2_sq
+    sigma12 = cv2.GaussianBlur(a * b, (11, 11), 1.5) - mu1_mu2
+    
+    ssim_map = ((2 * mu1_mu2 + _SSIM_C1) * (2 * sigma12 + _SSIM_C2)) / (
+        (mu1_sq + mu2_sq + _SSIM_C1) * (sigma1_sq + sigma2_sq + _SSIM_C2)
+    )
+    return float(ssim_map.mean())
+
+
+# Summed per-channel difference above which a pixel counts as changed
+_PIXEL_DIFF_THRESHOLD = 15
+
+@lru_cache(maxsize=1)
+def _pixel_diff_kernel():
+    """Optional JIT kernel for the pixel_perfect diff, loaded on first use; None without numba"""
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
+    
+    @njit(parallel=True, fastmath=True, cache=True)
+    def kernel(a, b, threshold):
+        h, w, c = a.shape
+        total = 0.0
+        diffs = 0
+        for i in prange(h):
+            for j in range(w):
+                d = (abs(int(a[i, j, 0]) - int(b[i, j, 0]))
+                     + abs(int(a[i, j, 1]) - int(b[i, j, 1]))
+                     + abs(int(a[i, j, 2]) - int(b[i, j, 2])))
+                total += d
+                if d > threshold:
+                    diffs += 1
+        return total / (h * w * 3 * 255), diffs
+    
+    return kernel
+
+
+def pixel_diff_score(a, b, threshold=_PIXEL_DIFF_THRESHOLD):
+    """Normalised mean absolute difference of two same-sized BGR images and the count of changed pixels"""
+    import numpy as np
+    kernel = _pixel_diff_kernel()
+    if kernel is not None:
+        error, diffs = kernel(np.ascontiguousarray(a), np.ascontiguousarray(b), threshold)
+        return float(error), int(diffs)
+    
+    d = np.abs(a.astype(np.int16) - b.astype(np.int16)).sum(axis=2)
+    return float(d.sum()) / (d.size * 3 * 255), int(np.count_nonzero(d > threshold))
+
+
+@dataclass
+class IssueTable:
+    """Per-region comparison results stored as parallel arrays, one entry per region"""
+    x: 'np.ndarray'
+    y: 'np.ndarray'
+    w: 'np.ndarray'
+    h: 'np.ndarray'
+    score: 'np.ndarray'
+    
+    @classmethod
+    def from_records(cls, records):
+        """Build from an iterable of {'x', 'y', 'w', 'h', 'score'} dicts"""
+        import numpy as np
+        records = list(records)
+        return cls(
+            x=np.fromiter((r['x'] for r in records), dtype=np.int32, count=len(records)),
+            y=np.fromiter((r['y'] for r in records), dtype=np.int32, count=len(records)),
+            w=np.fromiter((r['w'] for r in records), dtype=np.int32, count=len(records)),
+            h=np.fromiter((r['h'] for r in records), dtype=np.int32, count=len(records)),
+            score=np.fromiter((r['score'] for r in records), dtype=np.float32, count=len(records))
+        )
+    
+    def __len__(self):
+        return len(self.score)
+    
+    def select(self, index):
+        """Rows picked by a boolean mask or index array"""
+        return IssueTable(self.x[index], self.y[index], self.w[index], self.h[index], self.score[index])
+    
+    def below(self, threshold):
+        """Regions scoring under threshold, worst first"""
+        import numpy as np
+        flagged = self.select(self.score < threshold)
+        return flagged.select(np.argsort(flagged.score, kind='stable'))
+    
+    def to_dataframe(self):
+        """pandas view for report rendering"""
+        import pandas as pd
+        return pd.DataFrame({'x': self.x, 'y': self.y, 'w': self.w, 'h': self.h, 'score': self.score})
+
+
+def region_diff_table(a, b, tile=128):
+    """Score each tile x tile region of two same-sized BGR images by mean pixel similarity"""
+    import cv2
+    import numpy as np
+    height, width = a.shape[:2]
+    rows, cols = -(-height // tile), -(-width // tile)
+    
+    diff = np.zeros((rows * tile, cols * tile), dtype=np.float32)
+    diff[:height, :width] = cv2.absdiff(a, b).mean(axis=2)
+    sums = diff.reshape(rows, tile, cols, tile).sum(axis=(1, 3))
+    
+    ys, xs = np.mgrid[0:rows, 0:cols] * tile
+    ws = np.minimum(tile, width - xs)
+    hs = np.minimum(tile, height - ys)
+    score = 1.0 - sums / (ws * hs * 255.0)
+    
+    return IssueTable(
+        x=xs.ravel().astype(np.int32),
+        y=ys.ravel().astype(np.int32),
+        w=ws.ravel().astype(np.int32),
+        h=hs.ravel().astype(np.int32),
+        score=score.ravel().astype(np.float32)
+    )
+
+
+def diff_image(a, b):
+    """Similarity of two same-sized images from their absolute difference, plus the difference as PNG bytes"""
+    import cv2
+    diff = cv2.absdiff(a, b)
+    score = 1.0 - float(diff.mean()) / 255.0
+    ok, encoded = cv2.imencode('.png', diff)
+    return score, encoded.tobytes() if ok else None
+
+
+# Longest side screenshots are reduced to before SSIM unless high fidelity is requested
+_SSIM_MAX_DIM = 1024
+# dHash bits allowed to differ before two images are treated as unchanged
+_DHASH_MAX_DISTANCE = 3
+# dHash only sees left-to-right gradients, so flat colour changes also have to stay under
+# this mean absolute difference (0-255) for the unchanged shortcut
+_UNCHANGED_MAX_MEAN_DIFF = 1.0
+
+
+def dhash(img, size=8):
+    """Difference hash: size*size bits comparing horizontally adjacent pixels of a tiny grayscale copy"""
+    import cv2
+    import numpy as np
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    return np.packbits((small[:, 1:] > small[:, :-1]).ravel()).tobytes()
+
+
+def _hamming_distance(hash_a, hash_b):
+    return bin(int.from_bytes(hash_a, 'big') ^ int.from_bytes(hash_b, 'big')).count('1')
+
+
+def _downsample(img, max_dim=_SSIM_MAX_DIM):
+    """Shrink an image so its longest side is at most max_dim"""
+    import cv2
+    scale = max_dim / max(img.shape[:2])
+    if scale < 1:
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return img
+
+
+def _as_bgr(image):
+    """BGR array for either encoded image bytes or an already decoded array"""
+    import cv2
+    import numpy as np
+    if isinstance(image, (bytes, bytearray)):
+        image = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Could not decode image data")
+    return image
+
+
+def compare_screenshots(image_a, image_b, high_fidelity=False, method="structural"):
+    """Bring two images (encoded bytes or BGR arrays) to a common size and compare them
+
+    Returns (similarity, difference PNG bytes, IssueTable of per-region scores); the last two
+    are None when the images are found unchanged.
+    """
+    import cv2
+    a = _as_bgr(image_a)
+    b = _as_bgr(image_b)
+    
+    if not high_fidelity:
+        a = _downsample(a)
+        b = _downsample(b)
+    
+    # Match the larger image to the smaller one so both go through SSIM at the same size
+    if a.shape[:2] != b.shape[:2]:
+        if a.shape[0] * a.shape[1] > b.shape[0] * b.shape[1]:
+            a = cv2.resize(a, (b.shape[1], b.shape[0]), interpolation=cv2.INTER_AREA)
+        else:
+            b = cv2.resize(b, (a.shape[1], a.shape[0]), interpolation=cv2.INTER_AREA)
+    
+    # Unchanged pages (the common case on reruns) don't need SSIM; pixel_perfect always diffs
+    if method != "pixel_perfect" and _hamming_distance(dhash(a), dhash(b)) <= _DHASH_MAX_DISTANCE:
+        small_a, small_b = (_downsample(a), _downsample(b)) if high_fidelity else (a, b)
+        if cv2.absdiff(small_a, small_b).mean() <= _UNCHANGED_MAX_MEAN_DIFF:
+            return 1.0, None, None
+    
+    if method == "pixel_perfect":
+        error, _ = pixel_diff_score(a, b)
+        score = 1.0 - error
+    else:
+        score = fast_ssim(a, b)
+    _, diff_png = diff_image(a, b)
+    return score, diff_png, region_diff_table(a, b)
+
+
+# Third-party trackers and media that don't affect layout; blocked for screenshot runs
+_DEFAULT_BLOCK_PATTERNS = (
+    '*google-analytics*',
+    '*googletagmanager*',
+    '*doubleclick*',
+    '*hotjar*',
+    '*segment.io*',
+    '*.mp4',
+    '*.webm',
+)
 
 
 class EnhancedChromeDriver:
@@ -156,9 +484,15 @@ class EnhancedChromeDriver:
     def __init__(self):
         self.driver = None
         self.options = None
+        # Pooled drivers are checked out exclusively, but keep navigation serialized regardless
+        self._lock = threading.Lock()
+        self._blocked_urls = []
+        self._scale_factor = 1
+        self.checkouts = 0
         
     def setup_driver(self, headless=True, window_size="1920,1080", scale_factor=1):
         """Setup Chrome driver with optimized options for screenshots"""
+        from selenium.webdriver.chrome.options import Options
         try:
             chrome_options = Options()
             
@@ -186,9 +520,11 @@ class EnhancedChromeDriver:
             # User agent for consistency
             chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
             
-            # Install and setup ChromeDriver
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            # Setup ChromeDriver (resolved once, not per launch)
+            self.driver = _launch_chrome(chrome_options)
+            # A fresh browser has nothing blocked or emulated yet
+            self._blocked_urls = []
+            self._scale_factor = scale_factor
             
             # Set timeouts
             self.driver.implicitly_wait(10)
@@ -205,73 +541,131 @@ class EnhancedChromeDriver:
             logger.error(f"Chrome driver setup failed: {e}")
             return False
     
-    def capture_full_page_screenshot(self, url, wait_time=3):
+    def _wait_for_page_idle(self, max_wait, poll_interval=0.1, quiet_period=0.5):
+        """Wait for document load, then until no new resource has loaded for quiet_period, up to max_wait seconds"""
+        from selenium.webdriver.support.ui import WebDriverWait
+        deadline = time.monotonic() + max_wait
+        try:
+            WebDriverWait(self.driver, max_wait).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
+        except TimeoutException:
+            return
+        
+        # Resource timing entries only appear once a request finishes, so a count that
+        # stops growing is the signal that the network has gone quiet
+        last_count = None
+        quiet_since = time.monotonic()
+        while time.monotonic() < deadline:
+            count = self.driver.execute_script(
+                "return performance.getEntriesByType('resource').length"
+            )
+            now = time.monotonic()
+            if count != last_count:
+                last_count, quiet_since = count, now
+            elif now - quiet_since >= quiet_period:
+                return
+            time.sleep(poll_interval)
+    
+    def set_scale_factor(self, scale_factor, window_size="1920,1080"):
+        """Emulate a device pixel ratio via CDP, so one browser serves every screenshot scale"""
+        if scale_factor == self._scale_factor:
+            return
+        width, height = window_size.split(',')
+        self.driver.execute_cdp_cmd('Emulation.setDeviceMetricsOverride', {
+            'width': int(width),
+            'height': int(height),
+            'deviceScaleFactor': scale_factor,
+            'mobile': False
+        })
+        self._scale_factor = scale_factor
+    
+    def _set_blocked_urls(self, block_patterns):
+        """Block matching requests via CDP; skipped when the patterns haven't changed"""
+        blocked = list(block_patterns or [])
+        if blocked == self._blocked_urls:
+            return
+        self.driver.execute_cdp_cmd('Network.enable', {})
+        self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked})
+        self._blocked_urls = blocked
+    
+    def capture_full_page_screenshot(self, url, wait_time=3, block_patterns=_DEFAULT_BLOCK_PATTERNS):
         """Capture full page screenshot with proper waiting"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
         if not self.driver:
             logger.error("Driver not initialized")
             return None
             
-        try:
-            # Navigate to URL
-            self.driver.get(url)
-            
-            # Wait for page load
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            
-            # Additional wait for dynamic content
-            time.sleep(wait_time)
+        with self._lock:
+            try:
+                # Layout is all that matters for comparison; skip trackers and media
+                self._set_blocked_urls(block_patterns)
+                
+                # Navigate to URL
+                self.driver.get(url)
             
-            # Execute JavaScript to ensure page is fully loaded
-            self.driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(1)
+                # Wait for page load
+                WebDriverWait(self.driver, 10).until(
+                    EC.presence_of_element_located((By.TAG_NAME, "body"))
+                )
             
-            # Get full page dimensions
-            total_height = self.driver.execute_script("return document.body.scrollHeight")
-            viewport_height = self.driver.execute_script("return window.innerHeight")
+                # Wait for dynamic content, but only as long as the page is still loading
+                self._wait_for_page_idle(wait_time)
             
-            # Take screenshot
-            screenshot = self.driver.get_screenshot_as_png()
+                # Capture the whole page in one DevTools call; without a clip only the viewport is returned
+                content = self.driver.execute_cdp_cmd('Page.getLayoutMetrics', {})['cssContentSize']
+                result = self.driver.execute_cdp_cmd('Page.captureScreenshot', {
+                    'format': 'png',
+                    'captureBeyondViewport': True,
+                    'fromSurface': True,
+                    'clip': {'x': 0, 'y': 0, 'width': content['width'], 'height': content['height'], 'scale': 1}
+                })
+                screenshot = base64.b64decode(result['data'])
             
-            logger.info(f"Screenshot captured for {url}: {len(screenshot)} bytes")
-            return screenshot
+                logger.info(f"Screenshot captured for {url}: {len(screenshot)} bytes")
+                return screenshot
             
-        except TimeoutException:
-            logger.error(f"Timeout waiting for page to load: {url}")
-            return None
-        except Exception as e:
-            logger.error(f"Screenshot capture failed for {url}: {e}")
-            return None
+            except TimeoutException:
+                logger.error(f"Timeout waiting for page to load: {url}")
+                return None
+            except Exception as e:
+                logger.error(f"Screenshot capture failed for {url}: {e}")
+                return None
     
     def capture_element_screenshot(self, url, css_selector, wait_time=3):
         """Capture screenshot of specific element"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
         if not self.driver:
             return None
             
-        try:
-            self.driver.get(url)
+        with self._lock:
+            try:
+                self.driver.get(url)
             
-            # Wait for element to be present
-            element = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, css_selector))
-            )
+                # Wait for element to be present
+                element = WebDriverWait(self.driver, 10).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, css_selector))
+                )
             
-            time.sleep(wait_time)
+                self._wait_for_page_idle(wait_time)
             
-            # Scroll element into view
-            self.driver.execute_script("arguments[0].scrollIntoView(true);", element)
-            time.sleep(1)
+                # Scroll element into view
+                self.driver.execute_script("arguments[0].scrollIntoView(true);", element)
+                time.sleep(1)
             
-            # Take element screenshot
-            screenshot = element.screenshot_as_png
+                # Take element screenshot
+                screenshot = element.screenshot_as_png
             
-            logger.info(f"Element screenshot captured for {css_selector}")
-            return screenshot
+                logger.info(f"Element screenshot captured for {css_selector}")
+                return screenshot
             
-        except Exception as e:
-            logger.error(f"Element screenshot failed: {e}")
-            return None
+            except Exception as e:
+                logger.error(f"Element screenshot failed: {e}")
+                return None
     
     def quit(self):
         """Properly close the driver"""
@@ -281,17 +675,112 @@ class EnhancedChromeDriver:
                 logger.info("Chrome driver closed successfully")
             except Exception as e:
                 logger.error(f"Error closing driver: {e}")
+    
+    def is_alive(self):
+        """Check the browser session still responds"""
+        if not self.driver:
+            return False
+        try:
+            self.driver.window_handles
+            return True
+        except WebDriverException:
+            return False
+
+
+# Drivers are quit and relaunched after this many checkouts to bound Chrome's native memory growth
+_CHROME_MAX_CHECKOUTS = 100
+
+
+_CHROME_POOL_SIZE = 2
+_CHROME_WINDOW_SIZE = "1920,1080"
+
+
+@st.cache_resource
+def _chrome_pool():
+    """Queue of Chrome driver slots shared by every session; browsers start on first checkout"""
+    pool = queue.Queue()
+    for _ in range(_CHROME_POOL_SIZE):
+        chrome_driver = EnhancedChromeDriver()
+        atexit.register(chrome_driver.quit)
+        pool.put(chrome_driver)
+    return pool
+
+
+@contextmanager
+def borrow_driver(scale_factor=1, timeout=60):
+    """Check a headless driver out of the pool at the given device scale and return it afterwards"""
+    pool = _chrome_pool()
+    try:
+        chrome_driver = pool.get(timeout=timeout)
+    except queue.Empty:
+        raise RuntimeError("No Chrome driver became available")
+    
+    try:
+        chrome_driver.checkouts += 1
+        if chrome_driver.checkouts > _CHROME_MAX_CHECKOUTS or not chrome_driver.is_alive():
+            chrome_driver.quit()
+            chrome_driver.checkouts = 1
+            if not chrome_driver.setup_driver(window_size=_CHROME_WINDOW_SIZE):
+                raise RuntimeError("Chrome driver setup failed")
+        chrome_driver.set_scale_factor(scale_factor, _CHROME_WINDOW_SIZE)
+        yield chrome_driver
+    finally:
+        # A driver whose relaunch failed goes back too; the next checkout retries it
+        pool.put(chrome_driver)
+
+
+# Chrome auto-updates at most daily; the disk-persisted version lookup is refreshed this often
+_CHROME_VERSION_TTL = 6 * 3600
+
+
+def _chrome_version_bucket():
+    return int(time.time() // _CHROME_VERSION_TTL)
+
+
+# Streamlit ignores ttl for disk-persisted caches, so callers pass a time bucket that rolls
+# over every _CHROME_VERSION_TTL seconds (see _chrome_version_bucket) to expire old entries
+@st.cache_data(persist="disk", show_spinner="Reading Chrome version…")
+def get_chrome_versions(time_bucket):
+    """(Chrome version, ChromeDriver version), kept on disk so restarts skip the Chrome launch"""
+    with borrow_driver() as chrome_driver:
+        capabilities = chrome_driver.driver.capabilities
+        return (
+            capabilities['browserVersion'],
+            capabilities['chrome']['chromedriverVersion'].partition(' ')[0]
+        )
 
 
 class EnhancedFigmaIntegration:
     """Enhanced Figma API integration with better error handling"""
     
+    # Compiled once; extract_file_id runs on most reruns
+    _FILE_ID_RE = re.compile(r'^[a-zA-Z0-9]{15,25}$')
+    _PATTERNS = [
+        re.compile(r'figma\.com/design/([a-zA-Z0-9]+)'),
+        re.compile(r'figma\.com/file/([a-zA-Z0-9]+)'),
+        re.compile(r'figma\.com/proto/([a-zA-Z0-9]+)'),
+        re.compile(r'figma\.com/[^/]+/([a-zA-Z0-9]+)'),
+    ]
+    
     def __init__(self, access_token):
         self.access_token = access_token
         self.base_url = "https://api.figma.com/v1"
         self.headers = {"X-Figma-Token": access_token}
         self.session = requests.Session()
         self.session.headers.update(self.headers)
+        # Room for parallel chunk/image requests; 429s and 5xx retried with backoff (honours Retry-After)
+        adapter = HTTPAdapter(
+            pool_connections=20,
+            pool_maxsize=50,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+        )
+        self.session.mount('https://', adapter)
     
     def validate_token(self):
         """Validate Figma access token"""
@@ -328,19 +817,12 @@ class EnhancedFigmaIntegration:
             return None
             
         # If it's already a clean file ID
-        if re.match(r'^[a-zA-Z0-9]{15,25}$', file_id_or_url):
+        if self._FILE_ID_RE.match(file_id_or_url):
             return file_id_or_url
         
         # Extract from URL patterns
-        patterns = [
-            r'figma\.com/design/([a-zA-Z0-9]+)',
-            r'figma\.com/file/([a-zA-Z0-9]+)',
-            r'figma\.com/proto/([a-zA-Z0-9]+)',
-            r'figma\.com/[^/]+/([a-zA-Z0-9]+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, file_id_or_url)
+        for pattern in self._PATTERNS:
+            match = pattern.search(file_id_or_url)
             if match:
                 return match.group(1)
         
@@ -354,7 +836,7 @@ class EnhancedFigmaIntegration:
             return {'error': 'Invalid file ID or URL'}
         
         # Validate file ID format
-        if not re.match(r'^[a-zA-Z0-9]{15,25}$', file_id):
+        if not self._FILE_ID_RE.match(file_id):
             return {
                 'error': f'Invalid file ID format: {file_id}',
                 'suggestion': 'File ID should be 15-25 alphanumeric characters'
@@ -416,71 +898,103 @@ class EnhancedFigmaIntegration:
                 'details': [str(e)]
             }
     
-    def get_file_images(self, file_id, node_ids=None, scale=1, format='png'):
+    def get_file_images(self, file_id, node_ids=None, scale=1, format='png', chunk_size=5, max_parallel=4):
         """Get rendered images with better error handling and retries"""
         file_id = self.extract_file_id(file_id)
         
         if not file_id:
             return {'error': 'Invalid file ID'}
         
-        try:
-            url = f"{self.base_url}/images/{file_id}"
-            params = {
-                'format': format,
-                'scale': scale
-            }
+        url = f"{self.base_url}/images/{file_id}"
+        params = {
+            'format': format,
+            'scale': scale
+        }
+        
+        if isinstance(node_ids, str):
+            node_ids = [node_id for node_id in node_ids.split(',') if node_id]
+        
+        if not node_ids or len(node_ids) <= chunk_size:
+            result = self._fetch_images_chunk(url, params, node_ids)
+        else:
+            # Figma renders each node server-side, so smaller concurrent requests finish sooner
+            chunks = [node_ids[i:i + chunk_size] for i in range(0, len(node_ids), chunk_size)]
+            with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+                chunk_results = list(executor.map(
+                    lambda chunk: self._fetch_images_chunk(url, params, chunk), chunks
+                ))
             
+            for chunk_result in chunk_results:
+                if 'error' in chunk_result:
+                    return chunk_result
+            
+            result = {'success': True, 'images': {}}
+            for chunk_result in chunk_results:
+                result['images'].update(chunk_result['images'])
+        
+        if result.get('success'):
+            result['file_id'] = file_id
+        return result
+    
+    def fetch_png(self, url):
+        """Download one rendered image and decode it straight into a BGR array"""
+        import cv2
+        import numpy as np
+        # Render URLs point at Figma's CDN, which doesn't need (or get) the API token
+        with self.session.get(url, stream=True, timeout=30, headers={"X-Figma-Token": None}) as response:
+            response.raise_for_status()
+            buffer = np.frombuffer(response.raw.read(decode_content=True), np.uint8)
+        return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    
+    def fetch_images(self, images, max_parallel=4):
+        """Download the {node_id: url} map from get_file_images concurrently; failed renders are skipped"""
+        renders = {node_id: url for node_id, url in images.items() if url}
+        with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+            arrays = executor.map(self.fetch_png, renders.values())
+            return dict(zip(renders.keys(), arrays))
+    
+    def _fetch_images_chunk(self, url, params, node_ids):
+        """Request renders for one batch of node IDs"""
+        try:
+            params = dict(params)
             if node_ids:
-                if isinstance(node_ids, list):
-                    params['ids'] = ','.join(node_ids)
-                else:
-                    params['ids'] = str(node_ids)
+                params['ids'] = ','.join(node_ids)
             
-            # Retry logic for image generation
-            max_retries = 3
-            for attempt in range(max_retries):
-                response = self.session.get(url, params=params, timeout=60)
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if 'images' in result and result['images']:
-                        return {
-                            'success': True,
-                            'images': result['images'],
-                            'file_id': file_id
-                        }
-                    else:
-                        return {
-                            'error': 'No images generated',
-                            'details': ['Figma could not generate images for the specified nodes']
-                        }
-                elif response.status_code == 400:
+            # Rate-limit and server-error retries happen in the session adapter
+            response = self.session.get(url, params=params, timeout=60)
+            
+            if response.status_code == 200:
+                result = response.json()
+                if 'images' in result and result['images']:
                     return {
-                        'error': 'Bad request',
-                        'details': [
-                            'Invalid node IDs or parameters',
-                            f'Attempted node IDs: {node_ids}',
-                            'Check that the nodes exist in the file'
-                        ]
+                        'success': True,
+                        'images': result['images']
                     }
-                elif response.status_code == 429:
-                    if attempt < max_retries - 1:
-                        wait_time = (attempt + 1) * 2
-                        logger.info(f"Rate limited, waiting {wait_time} seconds...")
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        return {
-                            'error': 'Rate limit exceeded',
-                            'details': ['Too many requests', 'Try again later']
-                        }
                 else:
                     return {
-                        'error': f'API error {response.status_code}',
-                        'details': [response.text[:500]]
+                        'error': 'No images generated',
+                        'details': ['Figma could not generate images for the specified nodes']
                     }
-            
-            return {'error': 'Max retries exceeded'}
+            elif response.status_code == 400:
+                return {
+                    'error': 'Bad request',
+                    'details': [
+                        'Invalid node IDs or parameters',
+                        f'Attempted node IDs: {node_ids}',
+                        'Check that the nodes exist in the file'
+                    ]
+                }
+            elif response.status_code == 429:
+                # Still rate limited after the adapter's retries
+                return {
+                    'error': 'Rate limit exceeded',
+                    'details': ['Too many requests', 'Try again later']
+                }
+            else:
+                return {
+                    'error': f'API error {response.status_code}',
+                    'details': [response.text[:500]]
+                }
             
         except Exception as e:
             return {
@@ -489,6 +1003,47 @@ class EnhancedFigmaIntegration:
             }
 
 
+def extract_pdf_text(file_bytes):
+    """Text of every PDF page, joined once rather than concatenated page by page"""
+    import PyPDF2
+    reader = PyPDF2.PdfReader(BytesIO(file_bytes))
+    return '\n'.join(page.extract_text() or '' for page in reader.pages)
+
+
+def extract_docx_text(file_bytes):
+    """Paragraph text of a Word document"""
+    import docx
+    return '\n'.join(paragraph.text for paragraph in docx.Document(BytesIO(file_bytes)).paragraphs)
+
+
+def extract_document_text(file_name, file_bytes):
+    """Dispatch on file extension to the matching text extractor"""
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension == '.pdf':
+        return extract_pdf_text(file_bytes)
+    if extension == '.docx':
+        return extract_docx_text(file_bytes)
+    return file_bytes.decode('utf-8', errors='replace')
+
+
+def _mask(value):
+    """First 8 and last 4 characters of a secret, or *** when it's too short to show any"""
+    return f"{value[:8]}...{value[-4:]}" if len(value) > 12 else "***"
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _env_status(names):
+    """(name, masked value, is set) for each environment variable in the names tuple"""
+    status = []
+    for name in names:
+        value = _env(name)
+        if value:
+            status.append((name, _mask(value), True))
+        else:
+            status.append((name, "Not set", False))
+    return status
+
+
 def create_progress_tracker():
     """Create a progress tracking system for long operations"""
     progress_container = st.empty()
@@ -528,6 +1083,19 @@ def display_configuration_status():
                     status_icon = "✅" if result['status'] else "❌"
                     st.write(f"**{service.title()} Connection:** {status_icon}")
                     st.caption(result['message'])
+        
+        # Chrome and connection checks are cached for a few minutes; force a fresh run
+        if st.button("Refresh Checks"):
+            check_chrome_driver.clear()
+            probe_api_connections.clear()
+            st.rerun()
+        
+        # Environment values are memoized; re-read .env after editing it
+        if st.button("Reload Environment"):
+            load_dotenv(override=True)
+            _env.cache_clear()
+            _env_status.clear()
+            st.rerun()
 
 
 def main():
@@ -545,15 +1113,22 @@ def main():
     # Configuration sidebar
     display_configuration_status()
     
-    # Main content tabs
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "Configuration & Testing",
-        "Document Processing", 
-        "Design Comparison",
-        "System Status"
-    ])
+    # Main content sections. st.tabs runs every tab body on each rerun; a radio lets only the
+    # selected section execute, so the diagnostics and comparison setup stay idle until opened
+    active_section = st.radio(
+        "Section",
+        [
+            "Configuration & Testing",
+            "Document Processing",
+            "Design Comparison",
+            "System Status"
+        ],
+        key="active_tab",
+        horizontal=True,
+        label_visibility="collapsed"
+    )
     
-    with tab1:
+    if active_section == "Configuration & Testing":
         st.header("Configuration & API Testing")
         
         col1, col2 = st.columns(2)
@@ -562,27 +1137,25 @@ def main():
             st.subheader("Chrome Driver Test")
             if st.button("Test Chrome Driver"):
                 with st.spinner("Testing Chrome driver..."):
-                    driver = EnhancedChromeDriver()
-                    if driver.setup_driver():
-                        st.success("Chrome driver is working correctly")
-                        
-                        # Test screenshot capability
-                        test_url = st.text_input("Test URL", "https://example.com")
-                        if st.button("Test Screenshot Capture"):
-                            screenshot = driver.capture_full_page_screenshot(test_url)
-                            if screenshot:
-                                st.success("Screenshot captured successfully!")
-                                st.image(screenshot, caption=f"Screenshot of {test_url}")
-                            else:
-                                st.error("Failed to capture screenshot")
-                        
-                        driver.quit()
-                    else:
+                    try:
+                        with borrow_driver() as driver:
+                            st.success("Chrome driver is working correctly")
+                            
+                            # Test screenshot capability
+                            test_url = st.text_input("Test URL", "https://example.com")
+                            if st.button("Test Screenshot Capture"):
+                                screenshot = driver.capture_full_page_screenshot(test_url)
+                                if screenshot:
+                                    st.success("Screenshot captured successfully!")
+                                    st.image(screenshot, caption=f"Screenshot of {test_url}")
+                                else:
+                                    st.error("Failed to capture screenshot")
+                    except RuntimeError:
                         st.error("Chrome driver setup failed")
         
         with col2:
             st.subheader("Figma API Test")
-            figma_token = os.getenv("FIGMA_ACCESS_TOKEN")
+            figma_token = _env("FIGMA_ACCESS_TOKEN")
             
             if figma_token:
                 figma_client = EnhancedFigmaIntegration(figma_token)
@@ -616,7 +1189,7 @@ def main():
             else:
                 st.warning("Figma access token not configured")
     
-    with tab2:
+    elif active_section == "Document Processing":
         st.header("Requirements Document Processing")
         st.info("Upload RFP, acceptance criteria, or requirements documents to generate test cases")
         
@@ -634,28 +1207,28 @@ def main():
                 update_progress, complete_progress = create_progress_tracker()
                 
                 try:
-                    update_progress(1, 4, "Reading document...")
-                    
-                    # Document processing logic would go here
-                    time.sleep(1)  # Simulate processing
-                    
-                    update_progress(2, 4, "Extracting text...")
-                    time.sleep(1)
-                    
-                    update_progress(3, 4, "Generating test cases...")
-                    time.sleep(1)
+                    update_progress(1, 2, "Reading document...")
+                    file_bytes = uploaded_file.getvalue()
                     
-                    update_progress(4, 4, "Creating Jira tickets...")
-                    time.sleep(1)
+                    update_progress(2, 2, "Extracting text...")
+                    document_text = extract_document_text(uploaded_file.name, file_bytes)
                     
                     complete_progress()
-                    st.success("Document processed successfully!")
+                    st.success(f"Extracted {len(document_text):,} characters from {uploaded_file.name}")
+                    with st.expander("Extracted Text"):
+                        st.text(document_text)
+                    st.download_button(
+                        "Download Extracted Text",
+                        document_text,
+                        file_name=f"{os.path.splitext(uploaded_file.name)[0]}.txt",
+                        mime="text/plain"
+                    )
                     
                 except Exception as e:
                     complete_progress()
                     st.error(f"Processing failed: {e}")
     
-    with tab3:
+    elif active_section == "Design Comparison":
         st.header("Design Comparison Testing")
         
         col1, col2 = st.columns(2)
@@ -677,6 +1250,11 @@ def main():
             similarity_threshold = st.slider("Similarity Threshold", 0.6, 1.0, 0.85, 0.05)
             screenshot_scale = st.selectbox("Screenshot Scale", [1, 2, 3], index=1)
             comparison_method = st.selectbox("Method", ["structural", "pixel_perfect"])
+            high_fidelity = st.checkbox(
+                "High fidelity",
+                value=False,
+                help="Compare at full resolution instead of downsampling to 1024px"
+            )
         
         if st.button("Start Design Comparison", type="primary"):
             if not figma_file_input or not website_url:
@@ -686,8 +1264,7 @@ def main():
                 
                 try:
                     # Initialize components
-                    figma_client = EnhancedFigmaIntegration(os.getenv("FIGMA_ACCESS_TOKEN"))
-                    chrome_driver = EnhancedChromeDriver()
+                    figma_client = EnhancedFigmaIntegration(_env("FIGMA_ACCESS_TOKEN"))
                     
                     update_progress(1, 6, "Validating Figma file...")
                     file_result = figma_client.get_file_info(figma_file_input)
@@ -701,95 +1278,141 @@ def main():
                         return
                     
                     update_progress(2, 6, "Setting up Chrome driver...")
-                    if not chrome_driver.setup_driver():
+                    try:
+                        with borrow_driver(scale_factor=screenshot_scale) as chrome_driver:
+                            update_progress(3, 6, "Capturing website screenshot...")
+                            website_screenshot = chrome_driver.capture_full_page_screenshot(website_url)
+                    except RuntimeError:
                         st.error("Failed to setup Chrome driver")
                         complete_progress()
                         return
                     
-                    update_progress(3, 6, "Capturing website screenshot...")
-                    website_screenshot = chrome_driver.capture_full_page_screenshot(website_url)
-                    
                     if not website_screenshot:
                         st.error("Failed to capture website screenshot")
-                        chrome_driver.quit()
                         complete_progress()
                         return
                     
                     update_progress(4, 6, "Generating Figma images...")
-                    # This would contain the actual Figma image generation logic
-                    time.sleep(2)  # Simulate processing
+                    # The first top-level frame stands in for the page being compared
+                    frame_ids = [
+                        node['id']
+                        for page in file_result['data']['document'].get('children', [])
+                        for node in page.get('children', [])
+                        if node.get('type') == 'FRAME'
+                    ]
+                    if not frame_ids:
+                        st.error("No top-level frames found in the Figma file")
+                        complete_progress()
+                        return
+                    
+                    images_result = figma_client.get_file_images(
+                        file_result['file_id'], frame_ids[:1], scale=screenshot_scale
+                    )
+                    if 'error' in images_result:
+                        st.error(f"Figma render error: {images_result['error']}")
+                        complete_progress()
+                        return
+                    
+                    figma_image = next(iter(figma_client.fetch_images(images_result['images']).values()), None)
+                    if figma_image is None:
+                        st.error("Failed to download the Figma render")
+                        complete_progress()
+                        return
                     
                     update_progress(5, 6, "Comparing images...")
-                    time.sleep(1)  # Simulate comparison
+                    similarity, diff_png, regions = compare_screenshots(
+                        figma_image, website_screenshot, high_fidelity, comparison_method
+                    )
+                    issues = regions.below(similarity_threshold) if regions is not None else None
                     
                     update_progress(6, 6, "Generating report...")
-                    time.sleep(1)  # Simulate report generation
-                    
                     complete_progress()
-                    chrome_driver.quit()
                     
                     st.success("Design comparison completed!")
                     
                     # Display results
-                    col_a, col_b = st.columns(2)
+                    col_a, col_b, col_c = st.columns(3)
                     with col_a:
+                        st.subheader("Figma Design")
+                        st.image(figma_image, channels="BGR", use_container_width=True)
+                    
+                    with col_b:
                         st.subheader("Website Screenshot")
                         st.image(website_screenshot, use_container_width=True)
                     
-                    with col_b:
+                    with col_c:
                         st.subheader("Comparison Results")
-                        st.metric("Similarity Score", "87.5%")
-                        st.metric("Issues Found", "3")
+                        st.metric("Similarity Score", f"{similarity:.1%}")
+                        st.metric("Status", "Pass" if similarity >= similarity_threshold else "Fail")
+                        st.metric("Issues Found", len(issues) if issues is not None else 0)
+                    
+                    if diff_png:
+                        st.subheader("Difference Map")
+                        st.image(diff_png, use_container_width=True)
+                    
+                    if issues:
+                        st.subheader("Regions Below Threshold")
+                        st.dataframe(issues.to_dataframe(), hide_index=True, use_container_width=True)
                         
                 except Exception as e:
                     complete_progress()
                     st.error(f"Comparison failed: {e}")
                     st.exception(e)
     
-    with tab4:
+    elif active_section == "System Status":
         st.header("System Status & Diagnostics")
         
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("Environment Variables")
-            env_vars = [
-                'GROQ_API_KEY',
-                'FIGMA_ACCESS_TOKEN', 
-                'JIRA_SERVER_URL',
-                'JIRA_EMAIL',
-                'JIRA_API_TOKEN',
-                'JIRA_PROJECT_KEY'
-            ]
-            
-            for var in env_vars:
-                value = os.getenv(var)
-                if value:
-                    masked_value = f"{value[:8]}...{value[-4:]}" if len(value) > 12 else "***"
-                    st.success(f"✅ {var}: {masked_value}")
-                else:
-                    st.error(f"❌ {var}: Not set")
+            # One table element instead of a success/error box per variable
+            env_rows = _env_status(_ENV_VARS)
+            st.dataframe(
+                {
+                    "Variable": [var for var, _, _ in env_rows],
+                    "Status": ["✅" if is_set else "❌" for _, _, is_set in env_rows],
+                    "Value": [shown for _, shown, _ in env_rows]
+                },
+                hide_index=True,
+                use_container_width=True
+            )
         
         with col2:
             st.subheader("System Information")
-            st.info(f"Python Version: {os.sys.version}")
-            st.info(f"Streamlit Version: {st.__version__}")
+            st.info(f"**Python Version**: {_PY_VER}  \n**Streamlit Version**: {_ST_VER}")
+            
+            # Display Chrome driver info (versions are cached; Refresh re-reads them after an upgrade)
+            with st.form("chrome_check", clear_on_submit=False):
+                check_col, refresh_col = st.columns(2)
+                with check_col:
+                    check_chrome = st.form_submit_button("Check Chrome Version")
+                with refresh_col:
+                    refresh_chrome = st.form_submit_button("Refresh")
             
-            # Display Chrome driver info
-            if st.button("Check Chrome Version"):
+            if refresh_chrome:
+                get_chrome_versions.clear()
+                st.session_state.pop("chrome_info", None)
+            
+            if check_chrome:
                 try:
-                    driver = EnhancedChromeDriver()
-                    if driver.setup_driver(headless=True):
-                        capabilities = driver.driver.capabilities
-                        chrome_version = capabilities['browserVersion']
-                        driver_version = capabilities['chrome']['chromedriverVersion'].split(' ')[0]
-                        st.success(f"Chrome: {chrome_version}")
-                        st.success(f"ChromeDriver: {driver_version}")
-                        driver.quit()
-                    else:
-                        st.error("Failed to get Chrome information")
-                except Exception as e:
+                    chrome_version, driver_version = get_chrome_versions(_chrome_version_bucket())
+                    st.session_state["chrome_info"] = (chrome_version, driver_version, time.time())
+                except RuntimeError as e:
+                    # Pool couldn't launch or hand out a driver
+                    st.error(str(e))
+                except (WebDriverException, FileNotFoundError) as e:
+                    # Expected when Chrome or ChromeDriver is missing or mismatched
                     st.error(f"Chrome check failed: {e}")
+                except Exception as e:
+                    logger.exception("Unexpected error during Chrome version check")
+                    st.exception(e)
+            
+            # Last result stays on screen across unrelated reruns
+            chrome_info = st.session_state.get("chrome_info")
+            if chrome_info:
+                st.success(f"Chrome: {chrome_info[0]}")
+                st.success(f"ChromeDriver: {chrome_info[1]} (checked {int(time.time() - chrome_info[2])}s ago)")
 
 
 if __name__ == "__main__":
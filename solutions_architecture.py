@@ -4,7 +4,8 @@ Provides AI-powered analysis of RFP documents and technical design generation
 """
 
 import streamlit as st
-import openai
+from openai import OpenAI, AsyncOpenAI
+import asyncio
 import json
 import io
 import os
@@ -15,8 +16,27 @@ from dataclasses import dataclass, asdict
 import PyPDF2
 import docx
 import re
+import hashlib
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
 
+import numpy as np
+
+# Optional shared cache: used only when redis is installed and REDIS_URL is set
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# Optional vector index for the semantic cache; NumPy dot products are used without it
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
 # Load environment variables
 load_dotenv()
 
@@ -24,6 +44,113 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+ANALYSIS_SYSTEM_PROMPT = "You are an expert Solutions Architect and Business Analyst. Provide detailed, actionable analysis of project documents."
+
+TECHNICAL_DESIGN_SYSTEM_PROMPT = """You are a senior Solutions Architect. Generate comprehensive, practical technical designs.
+
+Based on the requirements and project context supplied by the user, generate a comprehensive technical design.
+
+Please provide a detailed technical design including:
+1. System Architecture (components, services, data flow)
+2. Database Design (entities, relationships, schema)
+3. API Specifications (endpoints, methods, data formats)
+4. Technology Stack (frontend, backend, database, deployment)
+5. Security Considerations
+6. Scalability Plan
+7. Deployment Strategy
+8. Estimated Timeline
+
+Format the response as structured sections that can be easily parsed."""
+
+# Output rubric per analysis type; part of the static system prompt
+ANALYSIS_FOCUS_ITEMS = {
+    "Complete Project Analysis": [
+        "Key Requirements (functional and non-functional)",
+        "Technical Components needed",
+        "Business Objectives",
+        "Stakeholders involved",
+        "Constraints and limitations",
+        "Potential risks",
+        "Strategic recommendations",
+    ],
+    "Technical Requirements": [
+        "Technical specifications and requirements",
+        "System components and integrations",
+        "Performance requirements",
+        "Security requirements",
+        "Technology constraints",
+        "Technical risks and mitigation",
+    ],
+    "Business Requirements": [
+        "Business goals and objectives",
+        "User requirements and personas",
+        "Business processes affected",
+        "Success criteria and KPIs",
+        "Budget and timeline constraints",
+        "Business risks and opportunities",
+    ],
+    "Risk Assessment": [
+        "Technical risks and challenges",
+        "Business and operational risks",
+        "Project delivery risks",
+        "Security and compliance risks",
+        "Risk mitigation strategies",
+        "Contingency planning recommendations",
+    ],
+}
+
+# Upper bound on analysis requests in flight at once when several documents are uploaded
+MAX_CONCURRENT_ANALYSES = 10
+
+# Exact-match cache of AI results, keyed on a hash of the model, task and full input text
+_ANALYSIS_CACHE_SIZE = 128
+_ANALYSIS_CACHE_TTL = 86400
+_analysis_cache = OrderedDict()
+_analysis_cache_lock = threading.Lock()
+_redis_client = None
+
+if REDIS_AVAILABLE and os.getenv("REDIS_URL"):
+    try:
+        _redis_client = redis.Redis.from_url(os.getenv("REDIS_URL"))
+    except Exception as e:
+        logger.warning(f"Redis cache unavailable: {e}")
+
+def _analysis_cache_key(*parts: str) -> str:
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+def _analysis_cache_get(key: str) -> Optional[Dict[str, Any]]:
+    """Cached result dict for key, checking this process first and then Redis"""
+    with _analysis_cache_lock:
+        value = _analysis_cache.get(key)
+        if value is not None:
+            _analysis_cache.move_to_end(key)
+            return value
+    
+    if _redis_client is not None:
+        try:
+            raw = _redis_client.get(f"analysis:{key}")
+        except Exception as e:
+            logger.warning(f"Redis cache read failed: {e}")
+            raw = None
+        if raw:
+            value = json.loads(raw)
+            with _analysis_cache_lock:
+                _analysis_cache[key] = value
+            return value
+    return None
+
+def _analysis_cache_put(key: str, value: Dict[str, Any]):
+    with _analysis_cache_lock:
+        _analysis_cache[key] = value
+        if len(_analysis_cache) > _ANALYSIS_CACHE_SIZE:
+            _analysis_cache.popitem(last=False)
+    
+    if _redis_client is not None:
+        try:
+            _redis_client.set(f"analysis:{key}", json.dumps(value), ex=_ANALYSIS_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Redis cache write failed: {e}")
+
 @dataclass
 class DocumentAnalysis:
     """Structure for document analysis results"""
@@ -38,6 +165,8 @@ class DocumentAnalysis:
     recommendations: List[str]
     confidence_score: float
     analysis_timestamp: str
+    # Set when the semantic cache reused the analysis of a near-duplicate document
+    reused_from: Optional[str] = None
 
 @dataclass
 class TechnicalDesign:
@@ -89,6 +218,63 @@ class DocumentProcessor:
             logger.error(f"TXT extraction failed: {e}")
             return ""
 
+EMBEDDING_MODEL = "text-embedding-3-small"
+SEMANTIC_CACHE_THRESHOLD = 0.95
+
+class SemanticCache:
+    """Reuse analyses of near-duplicate documents by cosine similarity of their embeddings"""
+    
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD, max_entries: int = 512):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # analysis_type -> {'index' or 'vectors', 'results'}; analyses only match within a type
+        self._entries = {}
+        self._lock = threading.Lock()
+    
+    def has_entries(self, analysis_type: str) -> bool:
+        """Whether any analysis of this type is stored, i.e. whether a lookup can hit"""
+        with self._lock:
+            entry = self._entries.get(analysis_type)
+            return bool(entry and entry['results'])
+    
+    def lookup(self, analysis_type: str, embedding: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Stored result of the most similar document, if it clears the threshold"""
+        with self._lock:
+            entry = self._entries.get(analysis_type)
+            if not entry or not entry['results']:
+                return None
+            
+            if FAISS_AVAILABLE:
+                scores, ids = entry['index'].search(embedding.reshape(1, -1), 1)
+                score, best = float(scores[0][0]), int(ids[0][0])
+            else:
+                similarities = np.vstack(entry['vectors']) @ embedding
+                best = int(np.argmax(similarities))
+                score = float(similarities[best])
+            
+            return entry['results'][best] if score >= self.threshold else None
+    
+    def add(self, analysis_type: str, embedding: np.ndarray, result: Dict[str, Any]):
+        with self._lock:
+            entry = self._entries.setdefault(analysis_type, {'results': []})
+            if len(entry['results']) >= self.max_entries:
+                return
+            
+            if FAISS_AVAILABLE:
+                if 'index' not in entry:
+                    entry['index'] = faiss.IndexFlatIP(embedding.shape[0])
+                entry['index'].add(embedding.reshape(1, -1))
+            else:
+                entry.setdefault('vectors', []).append(embedding)
+            entry['results'].append(result)
+
+_semantic_cache = SemanticCache()
+
+def _normalized_embedding(response) -> np.ndarray:
+    """Unit-length float32 vector, so inner product is cosine similarity"""
+    vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
 class AIAnalyzer:
     """AI-powered document analysis and design generation"""
     
@@ -109,7 +295,9 @@ class AIAnalyzer:
                 api_key = os.environ['OPENAI_API_KEY']
             
             if api_key:
-                openai.api_key = api_key
+                self.api_key = api_key
+                # The SDK retries 429s, timeouts and 5xx with exponential backoff
+                self.client = OpenAI(api_key=api_key, max_retries=5)
                 self.api_key_available = True
                 logger.info("OpenAI API key loaded successfully")
             else:
@@ -122,6 +310,64 @@ class AIAnalyzer:
             logger.error(f"OpenAI setup failed: {e}")
             return
     
+    def _analysis_request(self, document_text: str, analysis_type: str) -> Dict[str, Any]:
+        """Chat completion parameters for one document analysis (shared by sync, async and batch)"""
+        
+        # Static instructions lead so providers can reuse the cached prompt prefix across
+        # documents; only the user message varies
+        return {
+            "model": "gpt-4",
+            "messages": [
+                {"role": "system", "content": self._create_analysis_system_prompt(analysis_type)},
+                {"role": "user", "content": self._create_analysis_prompt(document_text)}
+            ],
+            "temperature": 0.3,
+            "max_tokens": 2000
+        }
+    
+    def _cached_analysis(self, request: Dict[str, Any], document_name: str, analysis_type: str):
+        """Previously parsed analysis for an identical request, re-labelled with this document's name"""
+        
+        cached = _analysis_cache_get(_analysis_cache_key(request["model"], analysis_type, json.dumps(request["messages"])))
+        if cached is None:
+            return None
+        return DocumentAnalysis(**{**cached, "document_name": document_name})
+    
+    def _store_analysis(self, request: Dict[str, Any], analysis_type: str, analysis: DocumentAnalysis,
+                        embedding: Optional[np.ndarray] = None):
+        _analysis_cache_put(_analysis_cache_key(request["model"], analysis_type, json.dumps(request["messages"])), asdict(analysis))
+        if embedding is not None:
+            _semantic_cache.add(analysis_type, embedding, asdict(analysis))
+    
+    def _semantic_analysis(self, embedding: Optional[np.ndarray], document_name: str, analysis_type: str):
+        """Analysis of a near-identical earlier document, re-labelled with this document's name"""
+        
+        if embedding is None:
+            return None
+        similar = _semantic_cache.lookup(analysis_type, embedding)
+        if similar is None:
+            return None
+        logger.info(f"Semantic cache hit for {document_name} (reusing {similar['document_name']})")
+        return DocumentAnalysis(**{**similar, "document_name": document_name, "reused_from": similar["document_name"]})
+    
+    def _embed(self, document_text: str) -> Optional[np.ndarray]:
+        try:
+            return _normalized_embedding(
+                self.client.embeddings.create(model=EMBEDDING_MODEL, input=document_text[:8000])
+            )
+        except Exception as e:
+            logger.warning(f"Embedding failed, skipping semantic cache: {e}")
+            return None
+    
+    async def _embed_async(self, client: AsyncOpenAI, document_text: str) -> Optional[np.ndarray]:
+        try:
+            return _normalized_embedding(
+                await client.embeddings.create(model=EMBEDDING_MODEL, input=document_text[:8000])
+            )
+        except Exception as e:
+            logger.warning(f"Embedding failed, skipping semantic cache: {e}")
+            return None
+    
     def analyze_document(self, document_text: str, document_name: str, analysis_type: str) -> DocumentAnalysis:
         """Analyze document content using OpenAI"""
         
@@ -129,27 +375,152 @@ class AIAnalyzer:
             return self._create_demo_analysis(document_name, analysis_type)
         
         try:
-            # Create analysis prompt based on type
-            prompt = self._create_analysis_prompt(document_text, analysis_type)
+            request = self._analysis_request(document_text, analysis_type)
+            cached = self._cached_analysis(request, document_name, analysis_type)
+            if cached is not None:
+                return cached
             
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert Solutions Architect and Business Analyst. Provide detailed, actionable analysis of project documents."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=2000
-            )
+            # Reformatted re-uploads miss the exact hash but land close in embedding space;
+            # with nothing of this type stored yet there's nothing to compare against
+            embedding = None
+            if _semantic_cache.has_entries(analysis_type):
+                embedding = self._embed(document_text)
+                similar = self._semantic_analysis(embedding, document_name, analysis_type)
+                if similar is not None:
+                    return similar
+            
+            response = self.client.chat.completions.create(**request)
             
             # Parse response into structured format
             analysis_text = response.choices[0].message.content
-            return self._parse_analysis_response(analysis_text, document_name, analysis_type)
+            analysis = self._parse_analysis_response(analysis_text, document_name, analysis_type)
+            if embedding is None:
+                embedding = self._embed(document_text)
+            self._store_analysis(request, analysis_type, analysis, embedding)
+            return analysis
             
         except Exception as e:
             logger.error(f"AI analysis failed: {e}")
             return self._create_demo_analysis(document_name, analysis_type)
     
+    async def analyze_document_async(self, client: AsyncOpenAI, semaphore: asyncio.Semaphore,
+                                     document_text: str, document_name: str, analysis_type: str) -> DocumentAnalysis:
+        """Async variant of analyze_document for running several documents concurrently"""
+        
+        try:
+            request = self._analysis_request(document_text, analysis_type)
+            cached = self._cached_analysis(request, document_name, analysis_type)
+            if cached is not None:
+                return cached
+            
+            async with semaphore:
+                embedding = None
+                if _semantic_cache.has_entries(analysis_type):
+                    embedding = await self._embed_async(client, document_text)
+                    similar = self._semantic_analysis(embedding, document_name, analysis_type)
+                    if similar is not None:
+                        return similar
+                
+                response = await client.chat.completions.create(**request)
+                if embedding is None:
+                    embedding = await self._embed_async(client, document_text)
+            
+            analysis_text = response.choices[0].message.content
+            analysis = self._parse_analysis_response(analysis_text, document_name, analysis_type)
+            self._store_analysis(request, analysis_type, analysis, embedding)
+            return analysis
+            
+        except Exception as e:
+            logger.error(f"AI analysis failed for {document_name}: {e}")
+            return self._create_demo_analysis(document_name, analysis_type)
+    
+    def analyze_documents(self, documents: List[tuple], analysis_type: str,
+                          max_concurrency: int = MAX_CONCURRENT_ANALYSES) -> List[DocumentAnalysis]:
+        """Analyze (document_name, document_text) pairs concurrently; results keep the input order"""
+        
+        if not self.api_key_available:
+            return [self._create_demo_analysis(name, analysis_type) for name, _ in documents]
+        
+        async def analyze_all():
+            # Client and semaphore are created inside the loop asyncio.run starts
+            semaphore = asyncio.Semaphore(max_concurrency)
+            async with AsyncOpenAI(api_key=self.api_key, max_retries=5) as client:
+                return await asyncio.gather(*(
+                    self.analyze_document_async(client, semaphore, text, name, analysis_type)
+                    for name, text in documents
+                ))
+        
+        return asyncio.run(analyze_all())
+    
+    def submit_batch(self, documents: List[tuple], analysis_type: str) -> str:
+        """Queue (document_name, document_text) analyses on the Batch API and return the batch ID"""
+        
+        # custom_id carries the upload position so names needn't be unique
+        lines = [
+            json.dumps({
+                "custom_id": f"{i}|{name}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._analysis_request(text, analysis_type)
+            })
+            for i, (name, text) in enumerate(documents)
+        ]
+        
+        batch_file = self.client.files.create(
+            file=("analysis_batch.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        logger.info(f"Submitted analysis batch {batch.id} with {len(lines)} documents")
+        return batch.id
+    
+    def poll_batch(self, batch_id: str, analysis_type: str) -> Dict[str, Any]:
+        """Check a submitted batch; once completed, include its analyses in upload order and
+        the (custom_id, error message) of every request that failed"""
+        
+        batch = self.client.batches.retrieve(batch_id)
+        result = {"status": batch.status, "analyses": [], "failures": []}
+        if batch.status != "completed":
+            return result
+        
+        outputs = []
+        for record in self._batch_records(batch.output_file_id):
+            index, _, document_name = record["custom_id"].partition("|")
+            response = record.get("response") or {}
+            
+            if response.get("status_code") == 200:
+                analysis_text = response["body"]["choices"][0]["message"]["content"]
+                outputs.append((int(index), self._parse_analysis_response(analysis_text, document_name, analysis_type)))
+            else:
+                result["failures"].append((record["custom_id"], self._batch_error_message(record)))
+        
+        # Requests that never produced a response (e.g. every one failed) are only in the error file
+        for record in self._batch_records(batch.error_file_id):
+            result["failures"].append((record["custom_id"], self._batch_error_message(record)))
+        
+        for custom_id, message in result["failures"]:
+            logger.error(f"Batch analysis failed for {custom_id}: {message}")
+        
+        result["analyses"] = [analysis for _, analysis in sorted(outputs, key=lambda item: item[0])]
+        return result
+    
+    def _batch_records(self, file_id: Optional[str]) -> List[Dict[str, Any]]:
+        """Parsed JSONL records of a batch output or error file; none when the file doesn't exist"""
+        if not file_id:
+            return []
+        return [json.loads(line) for line in self.client.files.content(file_id).text.splitlines() if line.strip()]
+    
+    @staticmethod
+    def _batch_error_message(record: Dict[str, Any]) -> str:
+        error = record.get("error") or ((record.get("response") or {}).get("body") or {}).get("error")
+        if isinstance(error, dict):
+            return error.get("message") or error.get("code") or "Unknown error"
+        return str(error) if error else "Unknown error"
+    
     def generate_technical_design(self, requirements: List[str], project_context: str) -> TechnicalDesign:
         """Generate technical design based on requirements"""
         
@@ -157,31 +528,22 @@ class AIAnalyzer:
             return self._create_demo_technical_design()
         
         try:
-            prompt = f"""
-            Based on the following requirements and project context, generate a comprehensive technical design:
-            
-            Project Context: {project_context}
-            
-            Requirements:
-            {chr(10).join(f"- {req}" for req in requirements)}
-            
-            Please provide a detailed technical design including:
-            1. System Architecture (components, services, data flow)
-            2. Database Design (entities, relationships, schema)
-            3. API Specifications (endpoints, methods, data formats)
-            4. Technology Stack (frontend, backend, database, deployment)
-            5. Security Considerations
-            6. Scalability Plan
-            7. Deployment Strategy
-            8. Estimated Timeline
+            cache_key = _analysis_cache_key("gpt-4", "technical_design", json.dumps(requirements), project_context)
+            cached = _analysis_cache_get(cache_key)
+            if cached is not None:
+                return TechnicalDesign(**cached)
             
-            Format the response as structured sections that can be easily parsed.
-            """
+            # Only the project-specific part goes in the user message; the rubric is a static prefix
+            prompt = (
+                f"Project Context: {project_context}\n\n"
+                "Requirements:\n"
+                + "\n".join(f"- {req}" for req in requirements)
+            )
             
-            response = openai.ChatCompletion.create(
+            response = self.client.chat.completions.create(
                 model="gpt-4",
                 messages=[
-                    {"role": "system", "content": "You are a senior Solutions Architect. Generate comprehensive, practical technical designs."},
+                    {"role": "system", "content": TECHNICAL_DESIGN_SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.3,
@@ -189,66 +551,32 @@ class AIAnalyzer:
             )
             
             design_text = response.choices[0].message.content
-            return self._parse_technical_design_response(design_text)
+            design = self._parse_technical_design_response(design_text)
+            _analysis_cache_put(cache_key, asdict(design))
+            return design
             
         except Exception as e:
             logger.error(f"Technical design generation failed: {e}")
             return self._create_demo_technical_design()
     
-    def _create_analysis_prompt(self, document_text: str, analysis_type: str) -> str:
-        """Create tailored analysis prompt"""
-        
-        base_prompt = f"""
-        Analyze the following document and extract key information:
-        
-        Document Content:
-        {document_text[:4000]}  # Limit to avoid token limits
-        
-        Analysis Focus: {analysis_type}
-        
-        Please provide a structured analysis including:
-        """
-        
-        if analysis_type == "Complete Project Analysis":
-            base_prompt += """
-            1. Key Requirements (functional and non-functional)
-            2. Technical Components needed
-            3. Business Objectives
-            4. Stakeholders involved
-            5. Constraints and limitations
-            6. Potential risks
-            7. Strategic recommendations
-            """
-        elif analysis_type == "Technical Requirements":
-            base_prompt += """
-            1. Technical specifications and requirements
-            2. System components and integrations
-            3. Performance requirements
-            4. Security requirements
-            5. Technology constraints
-            6. Technical risks and mitigation
-            """
-        elif analysis_type == "Business Requirements":
-            base_prompt += """
-            1. Business goals and objectives
-            2. User requirements and personas
-            3. Business processes affected
-            4. Success criteria and KPIs
-            5. Budget and timeline constraints
-            6. Business risks and opportunities
-            """
-        elif analysis_type == "Risk Assessment":
-            base_prompt += """
-            1. Technical risks and challenges
-            2. Business and operational risks
-            3. Project delivery risks
-            4. Security and compliance risks
-            5. Risk mitigation strategies
-            6. Contingency planning recommendations
-            """
-        
-        base_prompt += "\n\nProvide specific, actionable insights based on the document content."
-        return base_prompt
+    def _create_analysis_system_prompt(self, analysis_type: str) -> str:
+        """Role, focus and output rubric for an analysis type; identical for every document of that type"""
+        
+        focus_items = ANALYSIS_FOCUS_ITEMS.get(analysis_type, [])
+        return (
+            f"{ANALYSIS_SYSTEM_PROMPT}\n\n"
+            "Analyze the document supplied by the user and extract key information.\n\n"
+            f"Analysis Focus: {analysis_type}\n\n"
+            "Please provide a structured analysis including:\n"
+            + "".join(f"{n}. {item}\n" for n, item in enumerate(focus_items, 1))
+            + "\nProvide specific, actionable insights based on the document content."
+        )
+    
+    def _create_analysis_prompt(self, document_text: str) -> str:
+        """User message: only the document itself, after the cacheable system prefix"""
+        
+        # Limit to avoid token limits
+        return f"Document Content:\n{document_text[:4000]}"
     
     def _parse_analysis_response(self, response_text: str, document_name: str, analysis_type: str) -> DocumentAnalysis:
         """Parse AI response into structured analysis"""
@@ -491,6 +819,8 @@ class SolutionsArchitectureUI:
             st.session_state.analysis_results = []
         if 'technical_designs' not in st.session_state:
             st.session_state.technical_designs = []
+        if 'pending_batches' not in st.session_state:
+            st.session_state.pending_batches = []
     
     def render(self):
         """Main render method for Solutions Architecture tab"""
@@ -596,10 +926,70 @@ class SolutionsArchitectureUI:
                     help="Create user stories from the analyzed requirements"
                 )
             
+            use_batch = st.checkbox(
+                "Batch (50% cheaper)",
+                value=False,
+                help="Queue the analyses on OpenAI's Batch API. Results arrive within 24 hours; check back below."
+            )
+            
             # Process documents
             if st.button("🔍 Analyze Documents", type="primary"):
                 self.process_documents(uploaded_files, analysis_type, analysis_focus, 
-                                     include_technical_design, include_user_stories)
+                                     include_technical_design, include_user_stories,
+                                     use_batch=use_batch)
+        
+        self.render_pending_batches()
+    
+    def render_pending_batches(self):
+        """List queued batch analyses and collect the ones that have finished"""
+        
+        if not st.session_state.pending_batches:
+            return
+        
+        st.markdown("##### ⏳ Queued Batch Analyses")
+        for batch in st.session_state.pending_batches:
+            st.caption(f"Batch {batch['id']}: {', '.join(batch['documents'])} (submitted {batch['submitted']})")
+            
+            # Finished batches with failed requests stay listed until the failures are dismissed
+            if batch.get('failures'):
+                st.error(f"❌ Batch {batch['id']}: {len(batch['failures'])} request(s) failed")
+                for custom_id, message in batch['failures']:
+                    st.caption(f"• {custom_id.partition('|')[2]} (request {custom_id}): {message}")
+                if st.button("Dismiss", key=f"dismiss_batch_{batch['id']}"):
+                    st.session_state.pending_batches = [
+                        pending for pending in st.session_state.pending_batches if pending['id'] != batch['id']
+                    ]
+                    st.rerun()
+        
+        if st.button("🔄 Check Batch Status"):
+            still_pending = []
+            for batch in st.session_state.pending_batches:
+                if batch.get('failures'):
+                    # Already collected; only waiting for the failures to be dismissed
+                    still_pending.append(batch)
+                    continue
+                try:
+                    result = self.ai_analyzer.poll_batch(batch['id'], batch['analysis_type'])
+                except Exception as e:
+                    st.error(f"Could not check batch {batch['id']}: {e}")
+                    still_pending.append(batch)
+                    continue
+                
+                if result['status'] == 'completed':
+                    st.session_state.analysis_results.extend(result['analyses'])
+                    st.success(f"✅ Batch {batch['id']} finished: {len(result['analyses'])} documents analyzed")
+                    if result['failures']:
+                        st.error(f"❌ Batch {batch['id']}: {len(result['failures'])} request(s) failed; "
+                                 "details stay listed above until dismissed")
+                        batch['failures'] = result['failures']
+                        still_pending.append(batch)
+                elif result['status'] in ('failed', 'expired', 'cancelled'):
+                    st.error(f"❌ Batch {batch['id']} {result['status']}")
+                else:
+                    st.info(f"Batch {batch['id']}: {result['status']}")
+                    still_pending.append(batch)
+            
+            st.session_state.pending_batches = still_pending
     
     def render_analysis_results(self):
         """Display analysis results"""
@@ -613,6 +1003,9 @@ class SolutionsArchitectureUI:
         for i, analysis in enumerate(st.session_state.analysis_results):
             with st.expander(f"📄 {analysis.document_name} - {analysis.analysis_type}", expanded=i==0):
                 
+                if analysis.reused_from:
+                    st.info(f"♻️ Reused the analysis of near-identical document '{analysis.reused_from}'")
+                
                 # Analysis metadata
                 col_meta1, col_meta2 = st.columns(2)
                 with col_meta1:
@@ -852,11 +1245,13 @@ class SolutionsArchitectureUI:
                 st.metric("Risks Identified", total_risks)
     
     def process_documents(self, uploaded_files, analysis_type, analysis_focus, 
-                         include_technical_design, include_user_stories):
+                         include_technical_design, include_user_stories, use_batch=False):
         """Process uploaded documents and generate analysis"""
         
         with st.spinner("Processing documents and generating analysis..."):
             
+            # Extract every document first, then analyze them concurrently
+            documents = []
             for file in uploaded_files:
                 # Extract text based on file type
                 file_extension = file.name.lower().split('.')[-1]
@@ -875,15 +1270,32 @@ class SolutionsArchitectureUI:
                     st.warning(f"Could not extract text from {file.name}")
                     continue
                 
-                # Generate analysis
-                analysis = self.ai_analyzer.analyze_document(
-                    document_text, file.name, analysis_type
-                )
+                documents.append((file.name, document_text))
+            
+            if use_batch and documents and self.ai_analyzer.api_key_available:
+                try:
+                    batch_id = self.ai_analyzer.submit_batch(documents, analysis_type)
+                except Exception as e:
+                    st.error(f"❌ Batch submission failed: {e}")
+                    return
                 
+                st.session_state.pending_batches.append({
+                    'id': batch_id,
+                    'analysis_type': analysis_type,
+                    'documents': [name for name, _ in documents],
+                    'submitted': datetime.now().strftime('%Y-%m-%d %H:%M')
+                })
+                st.success(f"📨 Queued {len(documents)} documents as batch {batch_id}. Check back for results.")
+                return
+            
+            # Generate analysis
+            analyses = self.ai_analyzer.analyze_documents(documents, analysis_type)
+            
+            for analysis in analyses:
                 st.session_state.analysis_results.append(analysis)
                 
                 # Progress update
-                st.success(f"✅ Analyzed: {file.name}")
+                st.success(f"✅ Analyzed: {analysis.document_name}")
         
         st.success(f"🎉 Successfully analyzed {len(uploaded_files)} documents!")
         st.rerun()